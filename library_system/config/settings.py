@@ -1,42 +1,51 @@
 import json
 from library_system.utils.paths import AppPaths
+from library_system.managers.settings_manager import SettingsManager
 
 class ConfigManager:
+    """
+    Old JSON config API, now a view on SettingsManager so there is one cached
+    store. Values from an existing settings JSON file are imported once.
+    """
     _instance = None
+    # Old JSON keys that have a SettingsManager equivalent with the same values.
+    # Others (e.g. font_size in points, language "en") live under config/<key>.
+    _key_map = {
+        "theme": "appearance/theme",
+    }
+    # Returned by get() for old keys that were never set, as before
     _default_config = {
-        "theme": "Light",
         "font_size": 13,
-        "language": "en"
+        "language": "en",
     }
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(ConfigManager, cls).__new__(cls)
             cls._instance.config_file = AppPaths.get_settings_path()
-            cls._instance.config = cls._instance.load_config()
+            cls._instance.store = SettingsManager()
+            cls._instance.import_json_config()
         return cls._instance
 
-    def load_config(self):
-        if not self.config_file.exists():
-            return self._default_config.copy()
-        
-        try:
-            with open(self.config_file, "r") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error loading config: {e}")
-            return self._default_config.copy()
+    def _settings_key(self, key):
+        return self._key_map.get(key, f"config/{key}")
 
-    def save_config(self):
+    def import_json_config(self):
+        if self.store.get("config/json_imported", bool) or not self.config_file.exists():
+            return
         try:
-            with open(self.config_file, "w") as f:
-                json.dump(self.config, f, indent=4)
+            with open(self.config_file, "r") as f:
+                for key, value in json.load(f).items():
+                    self.store.set(self._settings_key(key), value)
+            self.store.set("config/json_imported", True)
         except Exception as e:
-            print(f"Error saving config: {e}")
+            print(f"Error importing config: {e}")
 
     def get(self, key, default=None):
-        return self.config.get(key, default)
+        value = self.store.get(self._settings_key(key))
+        if value is None:
+            return self._default_config.get(key, default)
+        return value
 
     def set(self, key, value):
-        self.config[key] = value
-        self.save_config()
+        self.store.set(self._settings_key(key), value)
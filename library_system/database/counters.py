@@ -0,0 +1,83 @@
+"""
+KPI counters in the `stats_counters` table (created by migration 6).
+
+Triggers on books / loans / members keep them current, so reading a KPI is
+a primary-key lookup. rebuild_counters() recomputes everything from the
+base tables and reports drift, e.g. after a restore or manual SQL edits:
+
+    python -m library_system.database.db --verify-counters
+    python -m library_system.database.db --rebuild-counters
+
+The "version:<table>" rows (migration 8) are write counters, not KPIs:
+they only ever increase and have no true value to verify or rebuild.
+"""
+
+# Counter name -> query computing its true value from the base tables
+COUNTER_QUERIES = {
+    "books_total": "SELECT COUNT(*) FROM books",
+    "stock_total": "SELECT COALESCE(SUM(stock), 0) FROM books",
+    "loans_total": "SELECT COUNT(*) FROM loans",
+    "loans_borrowed": "SELECT COUNT(*) FROM loans WHERE status = 'borrowed'",
+    "members_total": "SELECT COUNT(*) FROM members",
+    "members_active": "SELECT COUNT(*) FROM members WHERE is_active = 1",
+}
+
+# members.active_loans (migration 7) that disagree with the loans table
+_MEMBER_LOANS_DRIFT = """
+    SELECT m.id, m.active_loans, COUNT(l.id) AS actual
+    FROM members m
+    LEFT JOIN loans l ON l.member_id = m.id AND l.status = 'borrowed'
+    GROUP BY m.id
+    HAVING m.active_loans != COUNT(l.id)
+"""
+
+def read_counters(conn, *names):
+    """Stored counter values as a dict (all counters if no names are given)."""
+    names = names or tuple(COUNTER_QUERIES)
+    placeholders = ", ".join("?" for _ in names)
+    rows = conn.execute(
+        f"SELECT name, value FROM stats_counters WHERE name IN ({placeholders})", names
+    ).fetchall()
+    values = {row[0]: row[1] for row in rows}
+    missing = [name for name in names if name not in values]
+    if missing:
+        raise LookupError(f"Counters not initialised: {', '.join(missing)}")
+    return values
+
+def read_counter(conn, name):
+    return read_counters(conn, name)[name]
+
+def verify_counters(conn):
+    """
+    Compare stored counters with freshly computed values.
+    Returns {name: (stored, actual)} for every counter that drifted.
+    Per-member loan counts appear as "member:<id>:active_loans".
+    """
+    stored = dict(conn.execute("SELECT name, value FROM stats_counters").fetchall())
+    drift = {}
+    for name, query in COUNTER_QUERIES.items():
+        actual = conn.execute(query).fetchone()[0]
+        if stored.get(name) != actual:
+            drift[name] = (stored.get(name), actual)
+    for member_id, stored_loans, actual in conn.execute(_MEMBER_LOANS_DRIFT).fetchall():
+        drift[f"member:{member_id}:active_loans"] = (stored_loans, actual)
+    return drift
+
+def rebuild_counters(conn):
+    """Recompute every counter in one transaction. Returns the drift that was fixed."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        drift = verify_counters(conn)
+        for name, (_, actual) in drift.items():
+            if name.startswith("member:"):
+                member_id = int(name.split(":")[1])
+                conn.execute("UPDATE members SET active_loans = ? WHERE id = ?", (actual, member_id))
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO stats_counters (name, value) VALUES (?, ?)", (name, actual)
+                )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return drift
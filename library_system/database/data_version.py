@@ -0,0 +1,52 @@
+"""
+Cheap "has anything changed?" tokens for pages.
+
+Two sources are combined:
+- per-table write counters, bumped by the services after each commit
+  (DataVersion.bump, called by EventBus.publish), which cover writes
+  made by this process;
+- `PRAGMA data_version` on the GUI thread's connection, which changes
+  whenever any *other* connection commits (pooled workers, another
+  desk or process sharing the database file).
+
+A page stores the token it loaded with and skips reloading while the
+token is unchanged.
+"""
+import threading
+from library_system.database.db import db_connection
+
+class DataVersion:
+    _lock = threading.Lock()
+    _counters = {}
+
+    @classmethod
+    def bump(cls, *tables):
+        """Record a committed write to `tables`."""
+        with cls._lock:
+            for table in tables:
+                cls._counters[table] = cls._counters.get(table, 0) + 1
+
+    @classmethod
+    def get(cls, table):
+        return cls._counters.get(table, 0)
+
+    @classmethod
+    def token(cls, *tables, excluding=None):
+        """
+        Version token for data read from `tables`. Call it from the GUI
+        thread: data_version is only comparable on the same connection.
+        `excluding` is a published event whose own bump is left out, i.e.
+        the token as it was just before that write.
+        """
+        skip = set(excluding.tables) if excluding is not None else set()
+        try:
+            with db_connection() as conn:
+                data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        except Exception as e:
+            print(f"Error reading data_version: {e}")
+            # Unknown state: a fresh object never compares equal, so pages reload
+            return object()
+        with cls._lock:
+            return (data_version,) + tuple(
+                cls._counters.get(table, 0) - (table in skip) for table in tables
+            )
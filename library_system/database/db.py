@@ -1,12 +1,80 @@
 import sqlite3
 import os
+import queue
+import re
+import statistics
+import tempfile
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
 from datetime import datetime
 from library_system.utils.paths import AppPaths
+from library_system.database.migrations import migrate
+
+# Connection-level tuning, selected via the "system/db_profile" setting.
+# cache_size is negative = KiB (SQLite convention), mmap_size is in bytes.
+PERFORMANCE_PROFILES = {
+    # Stock SQLite behaviour: rollback journal + fsync on every commit.
+    "safe": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+    },
+    # WAL + NORMAL: survives app crashes, may lose the last commits on power loss.
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # No fsync at all. Fastest, but an OS crash or power cut can corrupt the DB.
+    "throughput": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+}
+DEFAULT_PROFILE = "balanced"
+
+# How many SQLite VM instructions run between cancellation checks
+CANCEL_CHECK_INTERVAL = 1000
+
+# Cancel flag of the query running on the current thread, see cancellable()
+_cancel_state = threading.local()
 
 def get_db_path():
     # Use cross-platform path
     return str(AppPaths.get_db_path())
 
+def get_profile_name():
+    """Active performance profile name from settings (falls back to DEFAULT_PROFILE)."""
+    from library_system.managers.settings_manager import SettingsManager
+    name = SettingsManager().get("system/db_profile", str)
+    return name if name in PERFORMANCE_PROFILES else DEFAULT_PROFILE
+
+def apply_profile(conn, profile_name=None):
+    """Apply the PRAGMAs of a performance profile to an open connection."""
+    name = profile_name or get_profile_name()
+    profile = PERFORMANCE_PROFILES.get(name, PERFORMANCE_PROFILES[DEFAULT_PROFILE])
+
+    # busy_timeout first, switching journal mode may need to wait for a lock
+    conn.execute(f"PRAGMA busy_timeout = {int(profile['busy_timeout'])}")
+    conn.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+    conn.execute(f"PRAGMA cache_size = {int(profile['cache_size'])}")
+    conn.execute(f"PRAGMA mmap_size = {int(profile['mmap_size'])}")
+    conn.execute(f"PRAGMA temp_store = {profile['temp_store']}")
+    return name
+
 def create_connection():
     """Create a database connection to the SQLite database."""
     conn = None
@@ -16,68 +84,348 @@ def create_connection():
         # print(f"[DEBUG] Connecting to DB: {db_file}") 
         conn = sqlite3.connect(db_file)
         conn.row_factory = sqlite3.Row  # Access columns by name
+        apply_profile(conn)
         return conn
     except sqlite3.Error as e:
         print(f"[ERROR] Error connecting to database at {db_file}: {e}")
     return conn
 
+class ConnectionManager:
+    """
+    Keeps SQLite connections alive between service calls.
+
+    The GUI (main) thread owns one long-lived connection, while worker threads
+    borrow connections from a bounded pool. Services use `db_connection()`
+    instead of opening and closing a connection on every call.
+    """
+    _instance = None
+
+    POOL_SIZE = 4
+    POOL_TIMEOUT = 10  # seconds to wait for a free pooled connection
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ConnectionManager, cls).__new__(cls)
+            cls._instance._init_state()
+        return cls._instance
+
+    def _init_state(self):
+        self._lock = threading.Lock()
+        self._owner_thread = threading.main_thread()
+        self._owner_conn = None
+        self._pool = queue.LifoQueue(maxsize=self.POOL_SIZE)
+        self._pool_open = 0
+        self._profile = get_profile_name()
+        self._watch_profile_setting()
+        # Bumped by close_all(); connections from an older generation are
+        # closed instead of being returned to the pool.
+        self._generation = 0
+        self._stats = {
+            "hits": 0,             # an existing connection was reused
+            "misses": 0,           # a new connection had to be opened
+            "health_failures": 0,  # a cached connection failed its ping
+            "waits": 0,            # pool exhausted, caller had to wait
+        }
+
+    def _open(self, shared=False):
+        conn = sqlite3.connect(get_db_path(), check_same_thread=not shared)
+        conn.row_factory = sqlite3.Row
+        apply_profile(conn, self._profile)
+        conn.set_progress_handler(_cancel_requested, CANCEL_CHECK_INTERVAL)
+        return conn
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    @staticmethod
+    def _discard(conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _owner_connection(self):
+        conn = self._owner_conn
+        if conn is not None:
+            if self._is_healthy(conn):
+                self._count("hits")
+                return conn
+            self._count("health_failures")
+            self._discard(conn)
+
+        self._owner_conn = self._open()
+        self._count("misses")
+        return self._owner_conn
+
+    def _acquire_pooled(self):
+        while True:
+            try:
+                conn, generation = self._pool.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_open = self._pool_open < self.POOL_SIZE
+                    if can_open:
+                        self._pool_open += 1
+                        generation = self._generation
+                if can_open:
+                    try:
+                        conn = self._open(shared=True)
+                    except sqlite3.Error:
+                        with self._lock:
+                            self._pool_open -= 1
+                        raise
+                    self._count("misses")
+                    return conn, generation
+
+                self._count("waits")
+                try:
+                    conn, generation = self._pool.get(timeout=self.POOL_TIMEOUT)
+                except queue.Empty:
+                    raise sqlite3.OperationalError("Timed out waiting for a pooled database connection")
+
+            if generation == self._generation and self._is_healthy(conn):
+                self._count("hits")
+                return conn, generation
+
+            if generation == self._generation:
+                self._count("health_failures")
+            self._drop_pooled(conn, generation)
+
+    def _drop_pooled(self, conn, generation):
+        with self._lock:
+            if generation == self._generation:
+                self._pool_open -= 1
+        self._discard(conn)
+
+    def _release_pooled(self, conn, generation):
+        if generation != self._generation:
+            self._drop_pooled(conn, generation)
+            return
+        try:
+            self._pool.put_nowait((conn, generation))
+        except queue.Full:
+            self._drop_pooled(conn, generation)
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager yielding a ready-to-use connection.
+
+        Uncommitted work is rolled back when the block exits, so a service
+        that returns early without commit() behaves like the old close().
+        """
+        pooled = threading.current_thread() is not self._owner_thread
+        if pooled:
+            conn, generation = self._acquire_pooled()
+        else:
+            conn = self._owner_connection()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            if pooled:
+                self._release_pooled(conn, generation)
+
+    def _watch_profile_setting(self):
+        # A changed system/db_profile applies right away, wherever it was set from
+        from library_system.managers.settings_manager import SettingsManager
+        SettingsManager().setting_changed.connect(self._on_setting_changed)
+
+    def _on_setting_changed(self, key, value):
+        if key == "system/db_profile" and value != self._profile:
+            self.set_profile(value)
+
+    def set_profile(self, profile_name):
+        """Switch performance profile; open connections are recycled so the new PRAGMAs apply."""
+        self._profile = profile_name if profile_name in PERFORMANCE_PROFILES else DEFAULT_PROFILE
+        self.close_all()
+
+    def close_all(self):
+        """Close all idle connections. Call on shutdown and before replacing the DB file."""
+        with self._lock:
+            self._generation += 1
+            self._pool_open = 0
+            owner_conn, self._owner_conn = self._owner_conn, None
+        if owner_conn is not None:
+            self._discard(owner_conn)
+
+        # Borrowed connections are closed when they are released.
+        while True:
+            try:
+                conn, _ = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self):
+        """Snapshot of the pool counters."""
+        with self._lock:
+            data = dict(self._stats)
+            data["pool_open"] = self._pool_open
+        data["pool_idle"] = self._pool.qsize()
+        total = data["hits"] + data["misses"]
+        data["hit_rate"] = (data["hits"] / total) if total else 0.0
+        return data
+
+
+def db_connection():
+    """Shortcut for `ConnectionManager().connection()`."""
+    return ConnectionManager().connection()
+
+def close_all_connections():
+    ConnectionManager().close_all()
+
+def _cancel_requested():
+    # Progress handler: a non-zero return makes SQLite abort the statement
+    token = getattr(_cancel_state, "token", None)
+    return 1 if token is not None and token.is_set() else 0
+
+@contextmanager
+def cancellable(token):
+    """
+    Statements run by this thread inside the block are aborted with
+    sqlite3.OperationalError("interrupted") once `token` (a threading.Event)
+    is set, even in the middle of a long scan.
+    """
+    previous = getattr(_cancel_state, "token", None)
+    _cancel_state.token = token
+    try:
+        yield
+    finally:
+        _cancel_state.token = previous
+
+def query_cancelled():
+    """True if the current thread is inside cancellable() and was cancelled."""
+    return bool(_cancel_requested())
+
+# Ids per statement in bulk operations (stays below SQLite's variable limit)
+BATCH_SIZE = 400
+
+def chunked(ids, size=BATCH_SIZE):
+    """
+    Split ids into (chunk, "?, ?, ...") pairs for `WHERE id IN (...)`.
+    Duplicates are dropped, order is kept.
+    """
+    ids = list(dict.fromkeys(ids))
+    for i in range(0, len(ids), size):
+        chunk = ids[i:i + size]
+        yield chunk, ", ".join("?" for _ in chunk)
+
+# Rows fetched per step when streaming a large result (exports)
+STREAM_CHUNK_SIZE = 2000
+
+def stream_query(query, params=(), chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yield the rows of `query` as lists of tuples, `chunk_size` at a time,
+    so only one chunk is in memory. The connection is held until the
+    generator is exhausted or closed; consume it on one thread.
+    """
+    with db_connection() as conn:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield [tuple(row) for row in rows]
+
+def split_page(rows, page_size, key_columns):
+    """
+    Helper for keyset pagination. `rows` was fetched with LIMIT page_size + 1;
+    returns (page_rows, next_cursor) where next_cursor holds the sort key of
+    the last row, or None when there are no more rows.
+    """
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        return rows, tuple(last[col] for col in key_columns)
+    return rows, None
+
+def fts_match_expression(keyword):
+    """
+    Turn free text typed by a user into a safe FTS5 prefix query.
+    'pemrog pyth' -> '"pemrog"* "pyth"*' (all terms must match).
+    Returns an empty string when the text has no searchable words.
+    """
+    tokens = re.findall(r"\w+", keyword or "", re.UNICODE)
+    return " ".join(f'"{t}"*' for t in tokens)
+
+def _fold(text):
+    # Same folding as the FTS tokenizer: case and diacritics are ignored
+    text = unicodedata.normalize("NFKD", str(text or "")).casefold()
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+def fts_prefix_match(keyword, *values):
+    """
+    In-memory equivalent of MATCH fts_match_expression(keyword): every word
+    of `keyword` is a prefix of some word in `values`. Used to narrow cached
+    search results without going back to the database.
+    """
+    words = re.findall(r"\w+", _fold(" ".join(str(v) for v in values if v)), re.UNICODE)
+    return all(
+        any(word.startswith(token) for word in words)
+        for token in re.findall(r"\w+", _fold(keyword), re.UNICODE)
+    )
+
+def measure_commit_latency(profile_name, iterations=200, db_file=None):
+    """
+    Benchmark small single-row commits (like a borrow/return) under a profile.
+
+    Runs against a scratch database unless `db_file` is given, so the real
+    library data is never touched. Returns timings in milliseconds.
+    """
+    tmp_dir = None
+    if db_file is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        db_file = os.path.join(tmp_dir.name, "bench.db")
+
+    conn = sqlite3.connect(db_file)
+    try:
+        apply_profile(conn, profile_name)
+        conn.execute("CREATE TABLE IF NOT EXISTS bench_commits (id INTEGER PRIMARY KEY, payload TEXT)")
+        conn.commit()
+
+        timings = []
+        for i in range(iterations):
+            start = time.perf_counter()
+            conn.execute("INSERT INTO bench_commits (payload) VALUES (?)", (f"row-{i}",))
+            conn.commit()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        conn.execute("DROP TABLE bench_commits")
+        conn.commit()
+    finally:
+        conn.close()
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+    timings.sort()
+    return {
+        "profile": profile_name,
+        "iterations": iterations,
+        "mean_ms": statistics.mean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        "max_ms": timings[-1],
+    }
+
 def initialize_db():
     """Initialize the database tables and default data."""
     conn = create_connection()
     if conn is not None:
         try:
+            # Create / upgrade schema (tables, indexes, ...)
+            migrate(conn)
+
             cursor = conn.cursor()
-            
-            # Categories Table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS categories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL
-            );
-            """)
-
-            # Books Table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS books (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                author TEXT NOT NULL,
-                publisher TEXT,
-                year INTEGER,
-                stock INTEGER DEFAULT 0,
-                category_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (category_id) REFERENCES categories (id)
-            );
-            """)
-
-            # Members Table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS members (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                member_code TEXT UNIQUE NOT NULL,
-                name TEXT NOT NULL,
-                email TEXT,
-                phone TEXT,
-                address TEXT,
-                is_active INTEGER DEFAULT 1,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            """)
-
-            # Loans Table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS loans (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                book_id INTEGER,
-                member_id INTEGER,
-                loan_date DATE,
-                return_date DATE,
-                status TEXT DEFAULT 'borrowed',
-                FOREIGN KEY (book_id) REFERENCES books (id),
-                FOREIGN KEY (member_id) REFERENCES members (id)
-            );
-            """)
 
             # Seed Categories if empty
             cursor.execute("SELECT count(*) FROM categories")
@@ -109,4 +457,36 @@ def initialize_db():
         print("Error! Cannot create the database connection.")
 
 if __name__ == "__main__":
-    initialize_db()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Library database utilities")
+    parser.add_argument("--bench-profiles", action="store_true",
+                        help="measure commit latency for every performance profile")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--verify-counters", action="store_true",
+                        help="compare the KPI counters with the base tables")
+    parser.add_argument("--rebuild-counters", action="store_true",
+                        help="recompute the KPI counters from the base tables")
+    args = parser.parse_args()
+
+    if args.bench_profiles:
+        for name in PERFORMANCE_PROFILES:
+            r = measure_commit_latency(name, args.iterations)
+            print(f"{name:<11} mean={r['mean_ms']:.3f}ms p50={r['p50_ms']:.3f}ms "
+                  f"p95={r['p95_ms']:.3f}ms max={r['max_ms']:.3f}ms")
+    elif args.verify_counters or args.rebuild_counters:
+        from library_system.database.counters import verify_counters, rebuild_counters
+        initialize_db()
+        conn = create_connection()
+        try:
+            drift = rebuild_counters(conn) if args.rebuild_counters else verify_counters(conn)
+        finally:
+            conn.close()
+        for name, (stored, actual) in drift.items():
+            print(f"{name:<15} stored={stored} actual={actual}")
+        action = "fixed" if args.rebuild_counters else "found"
+        print(f"{len(drift)} drifted counter(s) {action}")
+        if drift and not args.rebuild_counters:
+            raise SystemExit(1)
+    else:
+        initialize_db()
@@ -0,0 +1,397 @@
+"""
+Schema migrations keyed on `PRAGMA user_version`.
+
+Every entry in MIGRATIONS upgrades the schema by exactly one version and runs
+inside its own transaction, so an existing database is upgraded in place and
+a failed step leaves it at the previous version.
+"""
+
+def _v1_base_schema(cursor):
+    """Original tables. IF NOT EXISTS so pre-migration databases pass through."""
+    # Categories Table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL
+    );
+    """)
+
+    # Books Table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS books (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        author TEXT NOT NULL,
+        publisher TEXT,
+        year INTEGER,
+        stock INTEGER DEFAULT 0,
+        category_id INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (category_id) REFERENCES categories (id)
+    );
+    """)
+
+    # Members Table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS members (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        member_code TEXT UNIQUE NOT NULL,
+        name TEXT NOT NULL,
+        email TEXT,
+        phone TEXT,
+        address TEXT,
+        is_active INTEGER DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+
+    # Loans Table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS loans (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        book_id INTEGER,
+        member_id INTEGER,
+        loan_date DATE,
+        return_date DATE,
+        status TEXT DEFAULT 'borrowed',
+        FOREIGN KEY (book_id) REFERENCES books (id),
+        FOREIGN KEY (member_id) REFERENCES members (id)
+    );
+    """)
+
+def _v2_query_indexes(cursor):
+    """Indexes matching the WHERE / ORDER BY / GROUP BY clauses of the services."""
+    statements = [
+        # COUNT(*) WHERE status='borrowed' and the overdue filter on loan_date
+        # (LoanService, DashboardService, ReportService) - covering
+        "CREATE INDEX IF NOT EXISTS idx_loans_status_loan_date ON loans(status, loan_date)",
+        # Duplicate-loan check and per-member active count in borrow_book
+        """CREATE INDEX IF NOT EXISTS idx_loans_active_member_book
+           ON loans(member_id, book_id) WHERE status = 'borrowed'""",
+        # ORDER BY l.loan_date DESC and BETWEEN filters (get_all_loans, get_loans_by_period)
+        "CREATE INDEX IF NOT EXISTS idx_loans_loan_date ON loans(loan_date)",
+        # GROUP BY l.book_id (popular books) and the never-borrowed anti-join
+        "CREATE INDEX IF NOT EXISTS idx_loans_book ON loans(book_id)",
+        # GROUP BY l.member_id (most active members)
+        "CREATE INDEX IF NOT EXISTS idx_loans_member ON loans(member_id)",
+        # Returns branch of the recent-activity feed
+        """CREATE INDEX IF NOT EXISTS idx_loans_return_date
+           ON loans(return_date) WHERE return_date IS NOT NULL""",
+        # ORDER BY b.created_at DESC (book list), ORDER BY title, stock < 3
+        "CREATE INDEX IF NOT EXISTS idx_books_created_at ON books(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_books_title ON books(title)",
+        "CREATE INDEX IF NOT EXISTS idx_books_stock ON books(stock)",
+        # Member list (active only / all) and COUNT(*) WHERE is_active = 1
+        "CREATE INDEX IF NOT EXISTS idx_members_active_created ON members(is_active, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_members_created_at ON members(created_at)",
+    ]
+    for sql in statements:
+        cursor.execute(sql)
+
+def fts5_available(cursor):
+    """Some SQLite builds ship without FTS5; probe instead of assuming."""
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)")
+        cursor.execute("DROP TABLE temp._fts5_probe")
+        return True
+    except Exception:
+        return False
+
+def _v3_books_fts(cursor):
+    """Full-text index over book title/author/publisher, kept in sync by triggers."""
+    if not fts5_available(cursor):
+        # BookService.search_books falls back to LIKE when the table is missing
+        print("FTS5 not available in this SQLite build, skipping books_fts")
+        return
+
+    # External-content table: the text lives in `books`, FTS only stores the index
+    cursor.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+        title, author, publisher,
+        content='books', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    );
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS books_fts_ai AFTER INSERT ON books BEGIN
+        INSERT INTO books_fts(rowid, title, author, publisher)
+        VALUES (new.id, new.title, new.author, new.publisher);
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS books_fts_ad AFTER DELETE ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, publisher)
+        VALUES ('delete', old.id, old.title, old.author, old.publisher);
+    END;
+    """)
+    # Only text columns - stock changes on every borrow/return must not touch the index
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS books_fts_au AFTER UPDATE OF title, author, publisher ON books BEGIN
+        INSERT INTO books_fts(books_fts, rowid, title, author, publisher)
+        VALUES ('delete', old.id, old.title, old.author, old.publisher);
+        INSERT INTO books_fts(rowid, title, author, publisher)
+        VALUES (new.id, new.title, new.author, new.publisher);
+    END;
+    """)
+    # Backfill rows that existed before the index
+    cursor.execute("INSERT INTO books_fts(books_fts) VALUES ('rebuild')")
+
+def _v4_member_lookup(cursor):
+    """Case-insensitive B-tree on member_code plus full-text over name/email."""
+    # Serves exact and prefix lookups via a range scan (see MemberService.search_members)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_members_code_nocase
+    ON members(member_code COLLATE NOCASE)
+    """)
+
+    if not fts5_available(cursor):
+        print("FTS5 not available in this SQLite build, skipping members_fts")
+        return
+
+    # unicode61 splits e-mail addresses on '@' and '.', so "budi@mail.com"
+    # is findable by "budi" or "mail"
+    cursor.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS members_fts USING fts5(
+        name, email,
+        content='members', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    );
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS members_fts_ai AFTER INSERT ON members BEGIN
+        INSERT INTO members_fts(rowid, name, email) VALUES (new.id, new.name, new.email);
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS members_fts_ad AFTER DELETE ON members BEGIN
+        INSERT INTO members_fts(members_fts, rowid, name, email)
+        VALUES ('delete', old.id, old.name, old.email);
+    END;
+    """)
+    # is_active toggles must not rewrite the index
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS members_fts_au AFTER UPDATE OF name, email ON members BEGIN
+        INSERT INTO members_fts(members_fts, rowid, name, email)
+        VALUES ('delete', old.id, old.name, old.email);
+        INSERT INTO members_fts(rowid, name, email) VALUES (new.id, new.name, new.email);
+    END;
+    """)
+    cursor.execute("INSERT INTO members_fts(members_fts) VALUES ('rebuild')")
+
+def _v5_loan_due_date(cursor):
+    """
+    Store the due date on each loan so overdue filters are plain range
+    scans instead of date(loan_date, ...) evaluated on every row.
+    """
+    from library_system.managers.settings_manager import SettingsManager
+    duration = int(SettingsManager().get("loans/duration_days", int) or 7)
+
+    cursor.execute("ALTER TABLE loans ADD COLUMN due_date DATE")
+    # Existing loans get the loan period configured right now
+    cursor.execute(
+        "UPDATE loans SET due_date = date(loan_date, ?) WHERE due_date IS NULL",
+        (f"+{duration} days",)
+    )
+    # status = 'borrowed' AND due_date < today, ordered by due_date. Also covers
+    # COUNT(*) WHERE status = 'borrowed', so the loan_date variant is redundant
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_loans_status_due_date ON loans(status, due_date)")
+    cursor.execute("DROP INDEX IF EXISTS idx_loans_status_loan_date")
+
+def _v6_stats_counters(cursor):
+    """
+    Row counts and sums kept up to date by triggers, so dashboard and report
+    KPIs are primary-key lookups instead of COUNT(*) / SUM() scans.
+    See database/counters.py for reading and verifying them.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS stats_counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+    """)
+
+    # Books: count and total stock
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS stats_books_ai AFTER INSERT ON books BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'books_total';
+        UPDATE stats_counters SET value = value + COALESCE(new.stock, 0) WHERE name = 'stock_total';
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS stats_books_ad AFTER DELETE ON books BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'books_total';
+        UPDATE stats_counters SET value = value - COALESCE(old.stock, 0) WHERE name = 'stock_total';
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS stats_books_au AFTER UPDATE OF stock ON books BEGIN
+        UPDATE stats_counters SET value = value + COALESCE(new.stock, 0) - COALESCE(old.stock, 0)
+        WHERE name = 'stock_total';
+    END;
+    """)
+
+    # Loans: count and currently borrowed
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS stats_loans_ai AFTER INSERT ON loans BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'loans_total';
+        UPDATE stats_counters SET value = value + IFNULL(new.status = 'borrowed', 0) WHERE name = 'loans_borrowed';
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS stats_loans_ad AFTER DELETE ON loans BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'loans_total';
+        UPDATE stats_counters SET value = value - IFNULL(old.status = 'borrowed', 0) WHERE name = 'loans_borrowed';
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS stats_loans_au AFTER UPDATE OF status ON loans BEGIN
+        UPDATE stats_counters SET value = value + IFNULL(new.status = 'borrowed', 0) - IFNULL(old.status = 'borrowed', 0)
+        WHERE name = 'loans_borrowed';
+    END;
+    """)
+
+    # Members: count and active
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS stats_members_ai AFTER INSERT ON members BEGIN
+        UPDATE stats_counters SET value = value + 1 WHERE name = 'members_total';
+        UPDATE stats_counters SET value = value + IFNULL(new.is_active = 1, 0) WHERE name = 'members_active';
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS stats_members_ad AFTER DELETE ON members BEGIN
+        UPDATE stats_counters SET value = value - 1 WHERE name = 'members_total';
+        UPDATE stats_counters SET value = value - IFNULL(old.is_active = 1, 0) WHERE name = 'members_active';
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS stats_members_au AFTER UPDATE OF is_active ON members BEGIN
+        UPDATE stats_counters SET value = value + IFNULL(new.is_active = 1, 0) - IFNULL(old.is_active = 1, 0)
+        WHERE name = 'members_active';
+    END;
+    """)
+
+    # Initial values
+    cursor.execute("""
+    INSERT OR REPLACE INTO stats_counters (name, value)
+    SELECT 'books_total', COUNT(*) FROM books
+    UNION ALL SELECT 'stock_total', COALESCE(SUM(stock), 0) FROM books
+    UNION ALL SELECT 'loans_total', COUNT(*) FROM loans
+    UNION ALL SELECT 'loans_borrowed', COUNT(*) FROM loans WHERE status = 'borrowed'
+    UNION ALL SELECT 'members_total', COUNT(*) FROM members
+    UNION ALL SELECT 'members_active', COUNT(*) FROM members WHERE is_active = 1
+    """)
+
+def _v7_member_active_loans(cursor):
+    """
+    Per-member count of borrowed loans, kept by triggers, so the loan limit
+    check in LoanService.borrow_book is a column read instead of a COUNT.
+    """
+    cursor.execute("ALTER TABLE members ADD COLUMN active_loans INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("""
+    UPDATE members SET active_loans = (
+        SELECT COUNT(*) FROM loans
+        WHERE loans.member_id = members.id AND loans.status = 'borrowed'
+    )
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS members_active_loans_ai AFTER INSERT ON loans
+    WHEN new.status = 'borrowed' BEGIN
+        UPDATE members SET active_loans = active_loans + 1 WHERE id = new.member_id;
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS members_active_loans_ad AFTER DELETE ON loans
+    WHEN old.status = 'borrowed' BEGIN
+        UPDATE members SET active_loans = active_loans - 1 WHERE id = old.member_id;
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS members_active_loans_au AFTER UPDATE OF status, member_id ON loans BEGIN
+        UPDATE members SET active_loans = active_loans - 1
+        WHERE id = old.member_id AND old.status = 'borrowed';
+        UPDATE members SET active_loans = active_loans + 1
+        WHERE id = new.member_id AND new.status = 'borrowed';
+    END;
+    """)
+
+def _v8_table_versions(cursor):
+    """
+    Per-table write counters ("version:<table>" in stats_counters), bumped
+    by triggers on every row change. Unlike the in-process DataVersion they
+    survive restarts and see writes from other processes, so cached report
+    results can be keyed on them (services/report_cache.py).
+    """
+    for table in ("books", "loans", "members", "categories"):
+        # Random start, so a recreated database never repeats old versions
+        cursor.execute(
+            "INSERT OR IGNORE INTO stats_counters (name, value) VALUES (?, abs(random() % 1000000000))",
+            (f"version:{table}",)
+        )
+        for suffix, event in (("ai", "INSERT"), ("ad", "DELETE"), ("au", "UPDATE")):
+            cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS version_{table}_{suffix} AFTER {event} ON {table} BEGIN
+                UPDATE stats_counters SET value = value + 1 WHERE name = 'version:{table}';
+            END;
+            """)
+
+def _v9_report_cache(cursor):
+    """
+    Saved report results (services/report_cache.py), stored as JSON in the
+    database itself rather than in a file next to it.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS report_cache (
+        key TEXT PRIMARY KEY,
+        rows INTEGER NOT NULL,
+        result TEXT NOT NULL,
+        position INTEGER NOT NULL
+    );
+    """)
+
+# (version, description, function). Append only - never edit a released step.
+MIGRATIONS = [
+    (1, "base schema", _v1_base_schema),
+    (2, "indexes for service query patterns", _v2_query_indexes),
+    (3, "full-text search for books", _v3_books_fts),
+    (4, "indexed member lookup", _v4_member_lookup),
+    (5, "loan due dates", _v5_loan_due_date),
+    (6, "trigger-maintained KPI counters", _v6_stats_counters),
+    (7, "per-member active loan count", _v7_member_active_loans),
+    (8, "per-table version counters", _v8_table_versions),
+    (9, "saved report results", _v9_report_cache),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """
+    Bring the database up to LATEST_VERSION.
+    Returns the list of applied versions (empty if already current).
+    """
+    current = get_schema_version(conn)
+    applied = []
+
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        conn.execute("BEGIN")
+        try:
+            step(conn.cursor())
+            # PRAGMA does not accept bound parameters
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"Migration {version} applied: {description}")
+        applied.append(version)
+
+    if applied:
+        # Refresh planner statistics for the new indexes
+        conn.execute("PRAGMA optimize")
+    return applied
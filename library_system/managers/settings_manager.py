@@ -1,55 +1,124 @@
-from PySide6.QtCore import QSettings
+import atexit
+from PySide6.QtCore import QObject, QSettings, QThread, QTimer, Signal
 
-class SettingsManager:
+class SettingsManager(QObject):
+    """
+    Application settings, persisted in QSettings.
+
+    All values are loaded once into a typed in-memory snapshot, so get() never
+    touches QSettings and is cheap enough for hot paths (e.g. every checkout).
+    set() updates the snapshot, emits setting_changed and schedules a batched
+    write; pending changes are also flushed on exit.
+    """
     _instance = None
-    
+
+    # (key, new value)
+    setting_changed = Signal(str, object)
+
+    # Delay before changed values are written to disk
+    FLUSH_DELAY_MS = 500
+
     DEFAULTS = {
         "general/library_name": "Perpustakaan Daerah",
         "general/location": "Jakarta, Indonesia",
         "general/language": "Indonesia",
         "general/date_format": "dd/MM/yyyy",
-        
+
         "appearance/theme": "Light",
         "appearance/font_size": "Normal",
         "appearance/density": "Comfortable",
-        
+
         "loans/duration_days": 7,
         "loans/max_books": 3,
         "loans/fine_enabled": True,
         "loans/fine_per_day": 2000,
-        
-        "system/db_path": "library.db" # Relative path default
+
+        "reports/cache_persist": False, # Keep report results across restarts (in the DB)
+
+        "system/db_path": "library.db", # Relative path default
+        "system/db_profile": "balanced" # safe | balanced | throughput
     }
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(SettingsManager, cls).__new__(cls)
-            cls._instance.settings = QSettings("MyCompany", "LibrarySystem")
+            cls._instance._initialized = False
         return cls._instance
 
+    def __init__(self):
+        if self._initialized:
+            return
+        super().__init__()
+        self._initialized = True
+        self.settings = QSettings("MyCompany", "LibrarySystem")
+        self._cache = self._load_snapshot()
+        self._dirty = set()
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(self.FLUSH_DELAY_MS)
+        self._flush_timer.timeout.connect(self.flush)
+        atexit.register(self.flush)
+
+    def _load_snapshot(self):
+        cache = dict(self.DEFAULTS)
+        for key in self.settings.allKeys():
+            cache[key] = self._coerce(key, self.settings.value(key))
+        return cache
+
+    def _coerce(self, key, val):
+        # QSettings hands back strings on most backends; use the default's type
+        default = self.DEFAULTS.get(key)
+        if isinstance(default, bool):
+            return str(val).lower() == 'true'
+        if isinstance(default, int):
+            try:
+                return int(val)
+            except (TypeError, ValueError):
+                return default
+        return val
+
     def get(self, key, type_cls=None):
         """
-        Get setting value. 
+        Get setting value.
         key: 'category/setting_name'
         type_cls: int, bool, str (optional type casting)
         """
-        default = self.DEFAULTS.get(key)
-        val = self.settings.value(key, default)
-        
+        val = self._cache.get(key)
+
         if type_cls:
+            if isinstance(type_cls, type) and isinstance(val, type_cls):
+                return val
             if type_cls == bool:
                 return str(val).lower() == 'true'
             try:
                 return type_cls(val)
             except:
-                return default
+                return self.DEFAULTS.get(key)
         return val
 
     def set(self, key, value):
-        self.settings.setValue(key, value)
-        # Sync immediately
+        if key in self._cache and self._cache[key] == value:
+            return
+        self._cache[key] = value
+        self._dirty.add(key)
+        self.setting_changed.emit(key, value)
+
+        # Write in batches; the timer only runs on the thread that owns it
+        if QThread.currentThread() == self.thread():
+            self._flush_timer.start()
+        else:
+            self.flush()
+
+    def flush(self):
+        """Write pending changes to QSettings."""
+        if not self._dirty:
+            return
+        for key in sorted(self._dirty):
+            self.settings.setValue(key, self._cache[key])
+        self._dirty.clear()
         self.settings.sync()
 
     def get_all(self):
         """Debug method to see all stored settings"""
-        return self.settings.allKeys()
+        return sorted(self._cache)
@@ -1,9 +1,9 @@
-from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtCore import Qt, QModelIndex
+from library_system.models.paged_model import PagedTableModel
 
-class BookTableModel(QAbstractTableModel):
+class BookTableModel(PagedTableModel):
     def __init__(self, data=None):
-        super().__init__()
-        self._data = data or []
+        super().__init__(data)
         self._headers = ["ID", "Judul", "Penulis", "Penerbit", "Tahun", "Stok", "Kategori"]
 
     def flags(self, index):
@@ -16,7 +16,10 @@ class BookTableModel(QAbstractTableModel):
             return None
 
         if role == Qt.DisplayRole:
-            row_data = self._data[index.row()]
+            row_data = self.row_data(index.row())
+            if row_data is None:
+                # Page still loading
+                return self.PLACEHOLDER
             col = index.column()
             # ["ID", "Judul", "Penulis", "Penerbit", "Tahun", "Stok", "Kategori"]
             if col == 0: return str(row_data['id'])
@@ -35,10 +38,7 @@ class BookTableModel(QAbstractTableModel):
 
         return None
 
-    def rowCount(self, index):
-        return len(self._data)
-
-    def columnCount(self, index):
+    def columnCount(self, index=QModelIndex()):
         return len(self._headers)
 
     def headerData(self, section, orientation, role):
@@ -48,18 +48,3 @@ class BookTableModel(QAbstractTableModel):
             else:
                 return str(section + 1)
         return None
-
-    def update_data(self, new_data):
-        self.beginResetModel()
-        self._data = new_data
-        self.endResetModel()
-
-    def add_book(self, book):
-        self.beginInsertRows(QModelIndex(), self.rowCount(QModelIndex()), self.rowCount(QModelIndex()))
-        self._data.append(book)
-        self.endInsertRows()
-
-    def remove_book(self, row):
-        self.beginRemoveRows(QModelIndex(), row, row)
-        del self._data[row]
-        self.endRemoveRows()
@@ -1,10 +1,10 @@
-from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtCore import Qt, QModelIndex
 from PySide6.QtGui import QColor
+from library_system.models.paged_model import PagedTableModel
 
-class LoanTableModel(QAbstractTableModel):
+class LoanTableModel(PagedTableModel):
     def __init__(self, data=None):
-        super().__init__()
-        self._data = data or []
+        super().__init__(data)
         self._headers = ["ID", "Member", "Buku", "Tgl Pinjam", "Tgl Kembali", "Status"]
 
     def flags(self, index):
@@ -16,7 +16,10 @@ class LoanTableModel(QAbstractTableModel):
         if not index.isValid():
             return None
         
-        row_data = self._data[index.row()]
+        row_data = self.row_data(index.row())
+        if row_data is None:
+            # Page still loading
+            return self.PLACEHOLDER if role == Qt.DisplayRole else None
         status = row_data.get('status', 'borrowed')
         
         if role == Qt.DisplayRole:
@@ -52,9 +55,6 @@ class LoanTableModel(QAbstractTableModel):
 
         return None
 
-    def rowCount(self, index=QModelIndex()):
-        return len(self._data)
-
     def columnCount(self, index=QModelIndex()):
         return len(self._headers)
 
@@ -62,8 +62,3 @@ class LoanTableModel(QAbstractTableModel):
         if role == Qt.DisplayRole and orientation == Qt.Horizontal:
             return self._headers[section]
         return None
-
-    def update_data(self, new_data):
-        self.beginResetModel()
-        self._data = new_data
-        self.endResetModel()
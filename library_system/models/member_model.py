@@ -1,10 +1,10 @@
-from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtCore import Qt, QModelIndex
 from PySide6.QtGui import QColor
+from library_system.models.paged_model import PagedTableModel
 
-class MemberTableModel(QAbstractTableModel):
+class MemberTableModel(PagedTableModel):
     def __init__(self, data=None):
-        super().__init__()
-        self._data = data or []
+        super().__init__(data)
         # Columns: ID, Kode, Nama, Email, Phone, Status (Hidden/Active) -> Now Visible
         self._headers = ["ID", "Kode Anggota", "Nama", "Email", "No. Telp", "Alamat", "Status"]
 
@@ -17,7 +17,10 @@ class MemberTableModel(QAbstractTableModel):
         if not index.isValid():
             return None
         
-        row_data = self._data[index.row()]
+        row_data = self.row_data(index.row())
+        if row_data is None:
+            # Page still loading
+            return self.PLACEHOLDER if role == Qt.DisplayRole else None
         is_active = str(row_data.get('is_active', 1)) == '1'
         
         if role == Qt.ForegroundRole:
@@ -49,9 +52,6 @@ class MemberTableModel(QAbstractTableModel):
         
         return None
 
-    def rowCount(self, index=QModelIndex()):
-        return len(self._data)
-
     def columnCount(self, index=QModelIndex()):
         return len(self._headers)
 
@@ -62,8 +62,3 @@ class MemberTableModel(QAbstractTableModel):
             else:
                 return str(section + 1)
         return None
-
-    def update_data(self, new_data):
-        self.beginResetModel()
-        self._data = new_data
-        self.endResetModel()
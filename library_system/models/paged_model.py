@@ -0,0 +1,516 @@
+from bisect import bisect_right
+from collections import OrderedDict
+from PySide6.QtCore import QAbstractTableModel, QModelIndex
+
+class PagedTableModel(QAbstractTableModel):
+    """
+    Base class for table models fed by keyset-paginated service calls
+    (e.g. BookService.get_books_page).
+
+    Rows arrive one page at a time through canFetchMore/fetchMore as the view
+    scrolls. Only MAX_RESIDENT_PAGES pages are kept in memory: the least
+    recently used page is evicted and re-fetched from its recorded cursor if
+    the user scrolls back to it, so memory stays flat for any table size.
+
+    With a loader set (the page's run_query, see set_loader) pages are
+    fetched in the background: rows of a page that is still loading read as
+    None and are shown as PLACEHOLDER until it arrives. Without one (e.g. in
+    scripts) pages are fetched synchronously.
+
+    A plain list (e.g. search results) can still be shown with update_data().
+
+    Refreshes are applied as a keyed diff on the row `id` (see _apply_rows):
+    only the rows that were removed, inserted or changed emit signals, so
+    the view keeps its selection and scroll position. A full reset is only
+    used when switching sources or when rows were reordered.
+
+    Single committed changes can be applied without a refetch through
+    patch_rows(), insert_rows() and remove_keys(); pages may therefore hold
+    more or fewer than PAGE_SIZE rows.
+    """
+    PAGE_SIZE = 200
+    MAX_RESIDENT_PAGES = 10
+    KEY = "id"
+    PLACEHOLDER = "..."
+
+    def __init__(self, data=None):
+        super().__init__()
+        self._fetch_page = None         # callable(cursor, page_size) -> (rows, next_cursor)
+        self._page_cursors = []         # cursor that loads page i (None for page 0)
+        self._page_sizes = []           # rows in page i, also while it is evicted
+        self._page_starts = []          # first row number of page i
+        self._pages = OrderedDict()     # page index -> rows, in LRU order
+        self._next_cursor = None
+        self._has_more = False
+        self._static_rows = data or []  # used when no fetch function is set
+        self._row_count = len(self._static_rows)
+        self._loader = None             # run_query-like callable for background fetches
+        self._generation = 0            # bumped whenever the pages are replaced
+        self._loading_pages = set()     # evicted pages being fetched again
+        self._fetching_more = False
+
+    def set_loader(self, loader):
+        """
+        Fetch pages in the background through `loader`, called as
+        loader(fn, *args, on_result=..., on_error=...) (BasePage.run_query).
+        """
+        self._loader = loader
+
+    # ---- Sources ----
+
+    def set_source(self, fetch_page, first_page=None):
+        """
+        Switch to paged mode. `first_page` is an already fetched
+        (rows, next_cursor) tuple, e.g. loaded in the background;
+        otherwise the first page is fetched here.
+
+        Calling it again with the same fetch function is a refresh: the
+        pages loaded so far are fetched again (through the loader, if set)
+        and diffed against what is shown.
+        """
+        if first_page is None:
+            first_page = fetch_page(None, self.PAGE_SIZE)
+
+        if fetch_page == self._fetch_page and self._pages_contiguous():
+            further = len(self._page_cursors) - 1
+            if self._loader is None or further == 0 or first_page[1] is None:
+                self._refresh_pages(fetch_page, first_page, self._fetch_pages(
+                    fetch_page, first_page[1], self.PAGE_SIZE, further
+                ))
+                return
+            # The other loaded pages are fetched again in the background; the
+            # old rows stay on screen until they arrive
+            self._new_generation()
+            generation = self._generation
+            self._loader(
+                self._fetch_pages, fetch_page, first_page[1], self.PAGE_SIZE, further,
+                on_result=lambda pages: self._on_refresh_fetched(generation, fetch_page, first_page, pages),
+                on_error=lambda _: self._on_refresh_fetched(generation, fetch_page, first_page, ([], first_page[1]))
+            )
+            return
+
+        self._reset_source(fetch_page, first_page)
+
+    def update_data(self, new_data):
+        """Show a fixed list of rows (no paging)."""
+        if self._fetch_page is None:
+            self._apply_rows(new_data)
+            return
+
+        self.beginResetModel()
+        self._reset_state()
+        self._static_rows = list(new_data)
+        self._row_count = len(self._static_rows)
+        self.endResetModel()
+
+    def _reset_source(self, fetch_page, first_page):
+        self.beginResetModel()
+        self._reset_state()
+        self._fetch_page = fetch_page
+        self._append_page(None, *first_page)
+        self.endResetModel()
+
+    def _pages_contiguous(self):
+        # Nothing evicted yet: every loaded row is in memory and can be diffed
+        return self._fetch_page is not None and len(self._pages) == len(self._page_cursors)
+
+    @staticmethod
+    def _fetch_pages(fetch_page, cursor, page_size, count):
+        """
+        Up to `count` consecutive pages from `cursor` on, as
+        ([(cursor, rows), ...], cursor after the last page).
+        """
+        pages = []
+        while cursor is not None and len(pages) < count:
+            rows, following = fetch_page(cursor, page_size)
+            if not rows:
+                return pages, None
+            pages.append((cursor, rows))
+            cursor = following
+        return pages, cursor
+
+    def _on_refresh_fetched(self, generation, fetch_page, first_page, further):
+        # A newer refresh or source switch replaced this one
+        if generation != self._generation or fetch_page != self._fetch_page:
+            return
+        if self._pages_contiguous():
+            self._refresh_pages(fetch_page, first_page, further)
+        else:
+            self._reset_source(fetch_page, first_page)
+
+    def _refresh_pages(self, fetch_page, first_page, further):
+        # Diff the rows of the refetched pages against the loaded ones
+        further_pages, next_cursor = further
+        if first_page[1] is None:
+            further_pages = []
+        cursors = [None] + [cursor for cursor, _ in further_pages]
+        pages = [list(first_page[0])] + [rows for _, rows in further_pages]
+        rows = [row for page in pages for row in page]
+
+        # Diff in static mode, then cut the result back into pages
+        self._static_rows = self.loaded_rows()
+        self._fetch_page = None
+        self._apply_rows(rows)
+
+        self._fetch_page = fetch_page
+        self._new_generation()
+        self._pages = OrderedDict(enumerate(pages))
+        self._page_cursors = cursors
+        self._page_sizes = [len(page) for page in pages]
+        self._update_starts()
+        self._next_cursor = next_cursor
+        self._has_more = next_cursor is not None
+        self._static_rows = []
+
+    def _apply_rows(self, new_rows):
+        """
+        Turn the static rows into `new_rows`, emitting only rowsRemoved,
+        rowsInserted and dataChanged for rows whose key or content changed.
+        """
+        new_rows = list(new_rows)
+        old_rows = self._static_rows
+        key = self.KEY
+        try:
+            new_keys = {row[key] for row in new_rows}
+            old_keys = {row[key] for row in old_rows}
+        except (KeyError, TypeError):
+            new_keys = old_keys = None
+
+        # Unkeyed rows or duplicate keys can't be matched up
+        if (new_keys is None or len(new_keys) != len(new_rows)
+                or len(old_keys) != len(old_rows)):
+            self._reset_rows(new_rows)
+            return
+
+        # Rows kept on both sides must be in the same order, moves need a reset
+        kept_old = [row[key] for row in old_rows if row[key] in new_keys]
+        kept_new = [row[key] for row in new_rows if row[key] in old_keys]
+        if kept_old != kept_new:
+            self._reset_rows(new_rows)
+            return
+
+        # 1. Removals, bottom-up so earlier row numbers stay valid
+        row = len(old_rows) - 1
+        while row >= 0:
+            if old_rows[row][key] in new_keys:
+                row -= 1
+                continue
+            last = row
+            while row >= 0 and old_rows[row][key] not in new_keys:
+                row -= 1
+            self.beginRemoveRows(QModelIndex(), row + 1, last)
+            del old_rows[row + 1:last + 1]
+            self._row_count = len(old_rows)
+            self.endRemoveRows()
+
+        # 2. Insertions, top-down; old_rows is now a prefix-aligned subsequence
+        row = 0
+        while row < len(new_rows):
+            if new_rows[row][key] in old_keys:
+                row += 1
+                continue
+            first = row
+            while row < len(new_rows) and new_rows[row][key] not in old_keys:
+                row += 1
+            self.beginInsertRows(QModelIndex(), first, row - 1)
+            old_rows[first:first] = new_rows[first:row]
+            self._row_count = len(old_rows)
+            self.endInsertRows()
+
+        # 3. Changed contents, one dataChanged per run of changed rows
+        last_column = self.columnCount() - 1
+        row = 0
+        while row < len(new_rows):
+            if old_rows[row] == new_rows[row]:
+                row += 1
+                continue
+            first = row
+            while row < len(new_rows) and old_rows[row] != new_rows[row]:
+                old_rows[row] = new_rows[row]
+                row += 1
+            self.dataChanged.emit(self.index(first, 0), self.index(row - 1, last_column))
+
+        self._static_rows = new_rows
+
+    def _reset_rows(self, new_rows):
+        self.beginResetModel()
+        self._static_rows = new_rows
+        self._row_count = len(new_rows)
+        self.endResetModel()
+
+    def _new_generation(self):
+        # Fetches started before this point belong to pages that are gone
+        self._generation += 1
+        self._loading_pages.clear()
+        self._fetching_more = False
+
+    def _reset_state(self):
+        self._new_generation()
+        self._fetch_page = None
+        self._page_cursors = []
+        self._page_sizes = []
+        self._page_starts = []
+        self._pages.clear()
+        self._row_count = 0
+        self._next_cursor = None
+        self._has_more = False
+        self._static_rows = []
+
+    # ---- Row access ----
+
+    def row_data(self, row):
+        """
+        The dict for `row`, or None if there is no such row or its page was
+        evicted and is being loaded again (callers must check).
+        """
+        if self._fetch_page is None:
+            return self._static_rows[row] if 0 <= row < len(self._static_rows) else None
+
+        if not 0 <= row < self._row_count:
+            return None
+        page_no, offset = self._locate(row)
+        page = self._pages.get(page_no)
+        if page is None:
+            page = self._reload_page(page_no)
+            if page is None:
+                return None
+        else:
+            self._pages.move_to_end(page_no)
+        # A reloaded page can be shorter if rows were deleted meanwhile
+        return page[offset] if offset < len(page) else None
+
+    def loaded_rows(self):
+        """Rows currently in memory (static list or resident pages), in order."""
+        if self._fetch_page is None:
+            return list(self._static_rows)
+        return [row for _, page in sorted(self._pages.items()) for row in page]
+
+    def _locate(self, row):
+        # (page number, offset in page) of a row in paged mode
+        page_no = bisect_right(self._page_starts, row) - 1
+        return page_no, row - self._page_starts[page_no]
+
+    def _update_starts(self):
+        self._page_starts = []
+        total = 0
+        for size in self._page_sizes:
+            self._page_starts.append(total)
+            total += size
+        self._row_count = total
+
+    def _reload_page(self, page_no):
+        # Returns the rows if fetched synchronously, None while loading in the background
+        if page_no >= len(self._page_cursors):
+            return []
+        cursor, size = self._page_cursors[page_no], self._page_sizes[page_no]
+        if self._loader is None:
+            rows, _ = self._fetch_page(cursor, size)
+            self._store_page(page_no, rows)
+            return self._pages[page_no]
+
+        if page_no not in self._loading_pages:
+            self._loading_pages.add(page_no)
+            generation = self._generation
+            self._loader(
+                self._fetch_page, cursor, size,
+                on_result=lambda page: self._on_page_reloaded(generation, page_no, page[0]),
+                on_error=lambda _: self._on_page_failed(generation, page_no)
+            )
+        return None
+
+    def _on_page_reloaded(self, generation, page_no, rows):
+        if generation != self._generation:
+            return
+        self._loading_pages.discard(page_no)
+        if page_no in self._pages or page_no >= len(self._page_sizes):
+            return
+        self._store_page(page_no, rows)
+        rows = self._pages[page_no]
+        if rows:
+            start = self._page_starts[page_no]
+            self.dataChanged.emit(self.index(start, 0), self.index(start + len(rows) - 1, self.columnCount() - 1))
+
+    def _on_page_failed(self, generation, page_no):
+        # Placeholders stay; the page is requested again when next painted
+        if generation == self._generation:
+            self._loading_pages.discard(page_no)
+
+    def _store_page(self, page_no, rows):
+        size = self._page_sizes[page_no]
+        rows = list(rows[:size])
+        if len(rows) < size:
+            # Rows deleted meanwhile (e.g. by another process): drop them from the view
+            start = self._page_starts[page_no]
+            self.beginRemoveRows(QModelIndex(), start + len(rows), start + size - 1)
+            self._page_sizes[page_no] = len(rows)
+            self._update_starts()
+            self._pages[page_no] = rows
+            self.endRemoveRows()
+        else:
+            self._pages[page_no] = rows
+        self._evict()
+
+    def _append_page(self, cursor, rows, next_cursor):
+        self._page_cursors.append(cursor)
+        self._page_sizes.append(len(rows))
+        self._page_starts.append(self._row_count)
+        self._pages[len(self._page_cursors) - 1] = rows
+        self._row_count += len(rows)
+        self._next_cursor = next_cursor
+        self._has_more = next_cursor is not None
+        self._evict()
+
+    def _evict(self):
+        while len(self._pages) > self.MAX_RESIDENT_PAGES:
+            self._pages.popitem(last=False)
+
+    # ---- Patching single changes ----
+
+    def _resident(self):
+        # (row, container list, index in it) for every row held in memory
+        if self._fetch_page is None:
+            for row in range(len(self._static_rows)):
+                yield row, self._static_rows, row
+            return
+        for page_no, page in self._pages.items():
+            start = self._page_starts[page_no]
+            for offset in range(len(page)):
+                yield start + offset, page, offset
+
+    def has_evicted_pages(self):
+        return self._fetch_page is not None and len(self._pages) < len(self._page_cursors)
+
+    def find_row(self, key):
+        """Row number of the loaded row with this key, or -1."""
+        for row, container, i in self._resident():
+            if container[i].get(self.KEY) == key:
+                return row
+        return -1
+
+    def patch_rows(self, rows):
+        """
+        Replace loaded rows that have the same key as one of `rows`,
+        emitting dataChanged for each row that really changed. Rows that
+        are not loaded are ignored, they are read fresh when fetched.
+        """
+        by_key = {row[self.KEY]: row for row in rows}
+        if not by_key:
+            return
+        last_column = self.columnCount() - 1
+        for row, container, i in list(self._resident()):
+            new = by_key.get(container[i].get(self.KEY))
+            if new is not None and new != container[i]:
+                container[i] = new
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_column))
+
+    def remove_keys(self, keys):
+        """
+        Remove the loaded rows with these keys. Returns False if some of
+        them may be in an evicted page, i.e. the model can't be sure.
+        """
+        keys = set(keys)
+        found = [(row, container, i) for row, container, i in self._resident()
+                 if container[i].get(self.KEY) in keys]
+        # Bottom-up so row numbers found above stay valid
+        for row, container, i in sorted(found, key=lambda item: item[0], reverse=True):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del container[i]
+            if self._fetch_page is None:
+                self._row_count -= 1
+            else:
+                self._page_sizes[self._locate(row)[0]] -= 1
+                self._update_starts()
+            self.endRemoveRows()
+        return len(found) == len(keys) or not self.has_evicted_pages()
+
+    def insert_rows(self, position, rows):
+        """
+        Insert `rows` before row `position`; the caller knows where they
+        sort (e.g. 0 for newest-first lists). Returns False if that part
+        of the list isn't loaded.
+        """
+        rows = list(rows)
+        if not rows:
+            return True
+        if not 0 <= position <= self._row_count:
+            return False
+
+        if self._fetch_page is None:
+            self.beginInsertRows(QModelIndex(), position, position + len(rows) - 1)
+            self._static_rows[position:position] = rows
+            self._row_count += len(rows)
+            self.endInsertRows()
+            return True
+
+        if position == self._row_count:
+            if self._has_more:
+                # Not fetched yet, the rows arrive with their page
+                return True
+            page_no = len(self._page_cursors) - 1
+            offset = self._page_sizes[page_no]
+        else:
+            page_no, offset = self._locate(position)
+            if offset == 0 and page_no > 0:
+                # Rows before a page boundary belong to the previous page
+                page_no -= 1
+                offset = self._page_sizes[page_no]
+        page = self._pages.get(page_no)
+        if page is None:
+            return False
+
+        self.beginInsertRows(QModelIndex(), position, position + len(rows) - 1)
+        page[offset:offset] = rows
+        self._page_sizes[page_no] += len(rows)
+        self._update_starts()
+        self.endInsertRows()
+        return True
+
+    # ---- Incremental fetching ----
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._fetch_page is not None and self._has_more and not self._fetching_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        cursor = self._next_cursor
+        if self._loader is None:
+            self._append_fetched(cursor, *self._fetch_page(cursor, self.PAGE_SIZE))
+            return
+
+        self._fetching_more = True
+        generation = self._generation
+        self._loader(
+            self._fetch_page, cursor, self.PAGE_SIZE,
+            on_result=lambda page: self._on_more_fetched(generation, cursor, page),
+            on_error=lambda _: self._on_more_failed(generation)
+        )
+
+    def _on_more_fetched(self, generation, cursor, page):
+        if generation != self._generation or cursor != self._next_cursor:
+            return
+        self._fetching_more = False
+        self._append_fetched(cursor, *page)
+
+    def _on_more_failed(self, generation):
+        if generation == self._generation:
+            self._fetching_more = False
+
+    def _append_fetched(self, cursor, rows, next_cursor):
+        if not rows:
+            self._has_more = False
+            return
+
+        first = self._row_count
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._append_page(cursor, rows, next_cursor)
+        self.endInsertRows()
+
+    # ---- QAbstractTableModel ----
+
+    def rowCount(self, index=QModelIndex()):
+        if index.isValid():
+            return 0
+        return self._row_count
@@ -0,0 +1,62 @@
+from PySide6.QtCore import Qt, QModelIndex, QAbstractTableModel
+
+class ReportTableModel(QAbstractTableModel):
+    """
+    Read-only table for report tabs.
+
+    Rows are plain tuples (one value per column) set in a single reset, so a
+    large report costs one tuple per row instead of a QStandardItem per cell
+    and an insert signal per row. Cells are converted to text only when the
+    view asks for them; a row colour is given through ForegroundRole.
+    """
+    def __init__(self, headers, foreground=None):
+        super().__init__()
+        self._headers = list(headers)
+        self._rows = []
+        self._foreground = foreground
+
+    def set_rows(self, rows):
+        """Replace all rows; `rows` is a list of tuples in header order."""
+        self.beginResetModel()
+        self._rows = rows if isinstance(rows, list) else list(rows)
+        self.endResetModel()
+
+    def headers(self):
+        return list(self._headers)
+
+    def rowCount(self, index=QModelIndex()):
+        if index.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, index=QModelIndex()):
+        if index.isValid():
+            return 0
+        return len(self._headers)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        if role == Qt.DisplayRole:
+            value = self._rows[index.row()][index.column()]
+            return "" if value is None else str(value)
+
+        elif role == Qt.ForegroundRole:
+            return self._foreground
+
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            # ExportUtils passes a plain 1 for Qt.Horizontal
+            if Qt.Orientation(orientation) == Qt.Horizontal:
+                return self._headers[section]
+            else:
+                return str(section + 1)
+        return None
@@ -1,5 +1,8 @@
 from PySide6.QtWidgets import QWidget
-from PySide6.QtCore import Signal
+from PySide6.QtCore import Qt, Signal
+from library_system.services.async_runner import AsyncRunner
+from library_system.database.data_version import DataVersion
+from library_system.services.events import EventBus
 
 class BasePage(QWidget):
     """
@@ -7,10 +10,18 @@ class BasePage(QWidget):
     Enforces a common interface.
     """
     # Signal to request navigation to another page (by index or name)
-    navigate_to = Signal(int) 
+    navigate_to = Signal(int)
+    # Emitted when the page starts / stops waiting for background queries
+    loading_changed = Signal(bool)
+
+    # Tables the page shows data from. None = reload on every visit
+    data_tables = None
 
     def __init__(self):
         super().__init__()
+        self._pending_queries = 0
+        self._loaded_version = None
+        EventBus().published.connect(self._on_event)
 
     def refresh_data(self):
         """
@@ -18,3 +29,98 @@ class BasePage(QWidget):
         Should be overridden by subclasses.
         """
         pass
+
+    # ---- Change tracking ----
+
+    def data_version(self, excluding=None):
+        """
+        Token describing the data the page would load now (see DataVersion).
+        Subclasses can extend it, e.g. with today's date or a setting.
+        `excluding`: a published event, gives the token from just before it.
+        """
+        if self.data_tables is None:
+            return None
+        return DataVersion.token(*self.data_tables, excluding=excluding)
+
+    def refresh_if_stale(self):
+        """Reload only if the data changed since the last load. Returns True if reloaded."""
+        version = self.data_version()
+        if version is not None and version == self._loaded_version:
+            return False
+        # Taken before loading, so a write during the load triggers the next refresh
+        self._loaded_version = version
+        self.refresh_data()
+        return True
+
+    def mark_stale(self):
+        """Force the next refresh_if_stale() to reload."""
+        self._loaded_version = None
+
+    def reload_when_needed(self):
+        """Give up on patching: reload now if the page is shown, otherwise on the next visit."""
+        self.mark_stale()
+        if self.isVisible():
+            self.refresh_if_stale()
+
+    # ---- Change events ----
+
+    def _on_event(self, event):
+        if self.data_tables is None or not set(event.tables) & set(self.data_tables):
+            return
+        # Up to date before this write? Then a complete patch keeps it up to date
+        was_current = (self._loaded_version is not None
+                       and self._loaded_version == self.data_version(excluding=event))
+        if self.apply_event(event) and was_current:
+            self._loaded_version = self.data_version()
+
+    def apply_event(self, event):
+        """
+        Patch the page for a committed change (see services/events.py).
+        Return True if the page will be up to date without a reload; patches
+        that finish in the background call reload_when_needed() if they fail.
+        """
+        return False
+
+    # ---- Background queries ----
+
+    def run_query(self, fn, *args, on_result=None, on_error=None, key=None, **kwargs):
+        """
+        Run a service call off the GUI thread and hand the result to on_result.
+        The page is marked as loading until every pending query has returned.
+        Returns the key, which can be passed to cancel_query().
+        """
+        self._set_pending(self._pending_queries + 1)
+
+        def done(result):
+            self._set_pending(self._pending_queries - 1)
+            if on_result:
+                on_result(result)
+
+        def failed(message):
+            self._set_pending(self._pending_queries - 1)
+            if on_error:
+                on_error(message)
+
+        return AsyncRunner().run(fn, *args, key=key, on_result=done, on_error=failed, **kwargs)
+
+    def cancel_query(self, key):
+        """Cancel a query started with run_query(); its on_error gets CANCELLED."""
+        return AsyncRunner().cancel(key)
+
+    def is_loading(self):
+        return self._pending_queries > 0
+
+    def _set_pending(self, count):
+        was_loading = self.is_loading()
+        self._pending_queries = max(0, count)
+        if was_loading != self.is_loading():
+            if self.is_loading():
+                self.setCursor(Qt.BusyCursor)
+            else:
+                self.unsetCursor()
+            self.on_loading_changed(self.is_loading())
+            self.loading_changed.emit(self.is_loading())
+
+    def on_loading_changed(self, loading):
+        """Hook for subclasses to show a loading indicator."""
+        pass
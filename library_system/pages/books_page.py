@@ -6,11 +6,16 @@ from PySide6.QtGui import QAction, QKeySequence
 from PySide6.QtCore import Qt, QSortFilterProxyModel
 from library_system.models.book_model import BookTableModel
 from library_system.services.book_service import BookService
+from library_system.services.events import BookChanged
 from library_system.ui.add_book_dialog import AddBookDialog
+from library_system.ui.debounced_search import DebouncedSearch
 
 from library_system.pages.base_page import BasePage
 
 class BooksPage(BasePage):
+    SEARCH_LIMIT = 500
+    data_tables = ("books",)
+
     def __init__(self):
         super().__init__()
         self.layout = QVBoxLayout(self)
@@ -30,7 +35,6 @@ class BooksPage(BasePage):
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Cari judul, penulis...")
         self.search_input.setFixedWidth(300)
-        self.search_input.textChanged.connect(self.on_search_changed)
         
         self.add_btn = QPushButton("+ Tambah Buku")
         self.add_btn.setCursor(Qt.PointingHandCursor)
@@ -77,6 +81,8 @@ class BooksPage(BasePage):
         # Given "Query pencarian (LIKE)", I should probably use SQL search.
         
         self.table_view.setModel(self.model)
+        # Evicted pages and further pages load in the background
+        self.model.set_loader(self.run_query)
         self.table_view.selectionModel().selectionChanged.connect(self.on_selection_changed)
 
         self.layout.addWidget(self.table_view)
@@ -88,9 +94,12 @@ class BooksPage(BasePage):
 
         # Actions
         self.setup_actions()
-        
-        # Load initial data
-        self.refresh_data()
+
+        # Ranked full-text search; top hits are enough while typing
+        self.search = DebouncedSearch(
+            self, self.search_input, BookService.search_books, BookService.matches_search,
+            on_results=self.on_search_results, on_cleared=self.refresh_data, limit=self.SEARCH_LIMIT
+        )
 
     def setup_actions(self):
         # Select All Action
@@ -128,18 +137,58 @@ class BooksPage(BasePage):
         self.table_view.clearSelection()
 
     def refresh_data(self):
-        books = BookService.get_all_books()
-        self.model.update_data(books)
-        self.status_label.setText(f"{len(books)} total data")
+        # Keep an active search instead of replacing it with the full list
+        if self.search.is_active():
+            self.search.invalidate()
+            self.search.search_now()
+            return
+        # First page only, the rest streams in as the table is scrolled
+        self.run_query(BookService.get_books_page, None, BookTableModel.PAGE_SIZE, on_result=self.on_books_loaded)
+        self.run_query(BookService.estimate_total, on_result=self.on_total_estimated)
+
+    def on_books_loaded(self, first_page):
+        # A search may have been started while the full list was loading
+        if self.search_input.text().strip():
+            return
+        self.model.set_source(BookService.get_books_page, first_page)
         self.clear_selection()
 
-    def on_search_changed(self, text):
-        if len(text) > 0:
-            books = BookService.search_books(text)
-        else:
-            books = BookService.get_all_books()
+    def apply_event(self, event):
+        # Cached search results may be out of date now
+        self.search.invalidate()
+        if isinstance(event, BookChanged):
+            if event.change == "deleted":
+                return self.model.remove_keys(event.book_ids)
+            if self.search.is_active():
+                # Whether a new or edited book matches, and how it ranks, needs the search
+                return False
+            if event.change == "created":
+                self.run_query(BookService.get_books_by_ids, event.book_ids, on_result=self.on_books_created)
+                return True
+
+        # Edits and stock changes from loans: refetch only the rows on screen
+        book_ids = tuple(book_id for book_id in event.book_ids if self.model.find_row(book_id) >= 0)
+        if book_ids:
+            self.run_query(BookService.get_books_by_ids, book_ids, on_result=self.model.patch_rows)
+        return True
+
+    def on_books_created(self, books):
+        # Newest first, so new books go on top
+        if not self.model.insert_rows(0, books):
+            self.reload_when_needed()
+
+    def on_total_estimated(self, total):
+        if not self.search_input.text().strip():
+            self.status_label.setText(f"{total} total data")
+
+    def on_loading_changed(self, loading):
+        if loading:
+            self.status_label.setText("Memuat data...")
+
+    def on_search_results(self, books, elapsed_ms, from_cache):
         self.model.update_data(books)
-        self.status_label.setText(f"{len(books)} data ditemukan")
+        source = "cache" if from_cache else "db"
+        self.status_label.setText(f"{len(books)} data ditemukan ({elapsed_ms:.0f} ms, {source})")
 
     def on_selection_changed(self, selected, deselected):
         selected_rows = self.table_view.selectionModel().selectedRows()
@@ -161,7 +210,7 @@ class BooksPage(BasePage):
                 data['title'], data['author'], data['publisher'], 
                 data['year'], data['stock'], data['category_id']
             ):
-                self.refresh_data()
+                self.refresh_if_stale()
             else:
                 QMessageBox.critical(self, "Error", "Gagal menyimpan buku")
 
@@ -173,7 +222,10 @@ class BooksPage(BasePage):
         index = selected_rows[0]
         
         # Get raw data from model
-        book_data = self.model._data[index.row()]
+        book_data = self.model.row_data(index.row())
+        if book_data is None:
+            # Row still loading
+            return
         categories = BookService.get_categories()
         
         dialog = AddBookDialog(self, book_data=book_data, categories=categories)
@@ -184,20 +236,21 @@ class BooksPage(BasePage):
                 data['title'], data['author'], data['publisher'], 
                 data['year'], data['stock'], data['category_id']
             ):
-                self.refresh_data()
+                self.refresh_if_stale()
             else:
                 QMessageBox.critical(self, "Error", "Gagal mengupdate buku")
 
     def delete_book(self):
         selected_rows = self.table_view.selectionModel().selectedRows()
-        if not selected_rows: return
+        # Rows whose page is still loading can't be deleted yet
+        books = [book for book in (self.model.row_data(index.row()) for index in selected_rows) if book is not None]
+        if not books: return
         
-        count = len(selected_rows)
+        count = len(books)
         msg = f"Yakin ingin menghapus {count} buku terpilih?"
         if count == 1:
             # Show specific title if only one
-            book_data = self.model._data[selected_rows[0].row()]
-            msg = f"Yakin ingin menghapus '{book_data['title']}'?"
+            msg = f"Yakin ingin menghapus '{books[0]['title']}'?"
             
         reply = QMessageBox.question(
             self, "Konfirmasi Hapus", 
@@ -206,14 +259,14 @@ class BooksPage(BasePage):
         )
         
         if reply == QMessageBox.Yes:
-            success_count = 0
-            for index in selected_rows:
-                book_data = self.model._data[index.row()]
-                if BookService.delete_book(book_data['id']):
-                    success_count += 1
+            book_ids = [book['id'] for book in books]
+            
+            # One transaction for the whole selection
+            outcomes = BookService.delete_books(book_ids)
+            success_count = sum(1 for ok, _ in outcomes.values() if ok)
             
             if success_count > 0:
-                self.refresh_data()
+                self.refresh_if_stale()
                 if success_count < count:
                     QMessageBox.warning(self, "Partial Success", f"Hanya {success_count} dari {count} buku berhasil dihapus.")
             else:
@@ -1,3 +1,4 @@
+from datetime import date
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, 
     QTableView, QHeaderView, QAbstractItemView, QPushButton, QGridLayout, QListWidget
@@ -49,6 +50,7 @@ from library_system.pages.base_page import BasePage
 class DashboardPage(BasePage):
     # Signal to request page switch: index, tab_name (optional)
     # navigate_to = Signal(int) # Inherited from BasePage 
+    data_tables = ("books", "loans", "members")
 
     def __init__(self):
         super().__init__()
@@ -142,24 +144,37 @@ class DashboardPage(BasePage):
         
         self.layout.addLayout(shortcuts_layout)
 
-        # Load Data
-        self.refresh_data()
-
     def setup_urgent_model(self):
         self.urgent_model = QStandardItemModel()
         self.urgent_model.setHorizontalHeaderLabels(["Anggota", "Buku", "Jatuh Tempo"])
         self.urgent_table.setModel(self.urgent_model)
 
+    def data_version(self, excluding=None):
+        # Overdue counts move with the calendar even without writes
+        return (super().data_version(excluding), date.today())
+
     def refresh_data(self):
+        # Queries run in the background, each section fills in when ready
+        self.run_query(DashboardService.get_kpi_stats, on_result=self.on_stats_loaded)
+        self.run_query(DashboardService.get_urgent_tasks, on_result=self.on_tasks_loaded)
+        self.run_query(DashboardService.get_recent_activity, on_result=self.on_activity_loaded)
+
+    def apply_event(self, event):
+        # KPI cards come from counters and are cheap to refresh right away;
+        # the lists still reload on the next visit
+        if self.isVisible():
+            self.run_query(DashboardService.get_kpi_stats, on_result=self.on_stats_loaded)
+        return False
+
+    def on_stats_loaded(self, stats):
         # 1. KPI Stats
-        stats = DashboardService.get_kpi_stats()
         self.card_books.update_value(stats['books_available'])
         self.card_borrowed.update_value(stats['books_borrowed'])
         self.card_overdue.update_value(stats['total_overdue'])
         self.card_members.update_value(stats['active_members'])
-        
+
+    def on_tasks_loaded(self, tasks):
         # 2. Urgent Tasks
-        tasks = DashboardService.get_urgent_tasks()
         self.urgent_model.removeRows(0, self.urgent_model.rowCount())
         for t in tasks:
             row = [
@@ -169,9 +184,9 @@ class DashboardPage(BasePage):
             ]
             for item in row: item.setForeground(QColor("#C0392B")) # Red text
             self.urgent_model.appendRow(row)
-            
+
+    def on_activity_loaded(self, activity):
         # 3. Recent Activity
-        activity = DashboardService.get_recent_activity()
         self.activity_list.clear()
         for a in activity:
             icon = "📤" if a['type'] == 'Pinjam' else "📥"
@@ -5,11 +5,16 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt
 from library_system.models.loan_model import LoanTableModel
 from library_system.services.loan_service import LoanService
+from library_system.services.events import BookChanged, LoanCreated, LoanReturned, MemberStatusChanged
 from library_system.ui.loan_dialog import LoanDialog
+from library_system.utils.export_utils import ExportUtils
 
 from library_system.pages.base_page import BasePage
 
 class LoansPage(BasePage):
+    # Rows show book titles and member names too
+    data_tables = ("loans", "books", "members")
+
     def __init__(self):
         super().__init__()
         self.layout = QVBoxLayout(self)
@@ -29,6 +34,11 @@ class LoansPage(BasePage):
         self.return_btn.setEnabled(False)
         self.return_btn.clicked.connect(self.return_books)
 
+        self.export_btn = QPushButton("Export CSV")
+        self.export_btn.setCursor(Qt.PointingHandCursor)
+        self.export_btn.setObjectName("secondary-btn")
+        self.export_btn.clicked.connect(self.export_history)
+
         self.add_btn = QPushButton("+ Peminjaman Baru")
         self.add_btn.setCursor(Qt.PointingHandCursor)
         self.add_btn.setObjectName("primary-btn")
@@ -36,6 +46,7 @@ class LoansPage(BasePage):
         
         toolbar_layout.addWidget(self.title_label)
         toolbar_layout.addStretch()
+        toolbar_layout.addWidget(self.export_btn)
         toolbar_layout.addWidget(self.return_btn)
         toolbar_layout.addWidget(self.add_btn)
         
@@ -52,17 +63,56 @@ class LoansPage(BasePage):
         
         self.model = LoanTableModel()
         self.table_view.setModel(self.model)
+        # Evicted pages and further pages load in the background
+        self.model.set_loader(self.run_query)
         self.table_view.selectionModel().selectionChanged.connect(self.on_selection_changed)
         
         self.layout.addWidget(self.table_view)
-        
-        # Load Data
-        self.refresh_data()
 
     def refresh_data(self):
-        loans = LoanService.get_all_loans()
-        self.model.update_data(loans)
         self.return_btn.setEnabled(False) # Reset button
+        # First page only, older loans stream in as the table is scrolled
+        self.run_query(LoanService.get_loans_page, None, LoanTableModel.PAGE_SIZE, on_result=self.on_loans_loaded)
+
+    def on_loans_loaded(self, first_page):
+        self.model.set_source(LoanService.get_loans_page, first_page)
+        self.return_btn.setEnabled(False)
+
+    def apply_event(self, event):
+        if isinstance(event, LoanCreated):
+            self.run_query(LoanService.get_loans_by_ids, event.loan_ids, on_result=self.on_loans_created)
+            return True
+        if isinstance(event, LoanReturned):
+            loan_ids = tuple(loan_id for loan_id in event.loan_ids if self.model.find_row(loan_id) >= 0)
+            if loan_ids:
+                self.run_query(LoanService.get_loans_by_ids, loan_ids, on_result=self.on_loans_patched)
+            return True
+        if isinstance(event, MemberStatusChanged) or (isinstance(event, BookChanged) and event.change == "created"):
+            # Nothing shown here changes
+            return True
+        # Renamed or deleted books/members: rows don't carry their ids, reload
+        return False
+
+    def on_loans_created(self, loans):
+        # Today's loans sort first in the newest-first list
+        if not self.model.insert_rows(0, loans):
+            self.reload_when_needed()
+
+    def on_loans_patched(self, loans):
+        self.model.patch_rows(loans)
+        # The return button depends on the status of the selected rows
+        self.on_selection_changed(None, None)
+
+    def export_history(self):
+        # The whole history, not just the pages loaded in the table
+        headers = [self.model.headerData(col, Qt.Horizontal, Qt.DisplayRole) for col in range(self.model.columnCount())]
+        ExportUtils.export_query_to_csv(
+            self, headers, LoanService.iter_loan_history,
+            filename="riwayat_peminjaman.csv", total=LoanService.estimate_total()
+        )
+
+    def on_loading_changed(self, loading):
+        self.title_label.setText("Daftar Peminjaman (memuat...)" if loading else "Daftar Peminjaman")
 
     def on_selection_changed(self, selected, deselected):
         rows = self.table_view.selectionModel().selectedRows()
@@ -74,8 +124,9 @@ class LoansPage(BasePage):
         # Check if ALL selected rows are 'borrowed'
         all_borrowed = True
         for idx in rows:
-            row_data = self.model._data[idx.row()]
-            if row_data.get('status') != 'borrowed':
+            row_data = self.model.row_data(idx.row())
+            # A row still loading counts as not returnable yet
+            if row_data is None or row_data.get('status') != 'borrowed':
                 all_borrowed = False
                 break
         
@@ -83,9 +134,11 @@ class LoansPage(BasePage):
 
     def return_books(self):
         rows = self.table_view.selectionModel().selectedRows()
-        if not rows: return
+        # Rows whose page is still loading are skipped
+        loan_ids = [loan['id'] for loan in (self.model.row_data(idx.row()) for idx in rows) if loan is not None]
+        if not loan_ids: return
         
-        count = len(rows)
+        count = len(loan_ids)
         reply = QMessageBox.question(
             self, "Konfirmasi Pengembalian", 
             f"Yakin ingin mengembalikan {count} buku terpilih?",
@@ -93,15 +146,11 @@ class LoansPage(BasePage):
         )
         
         if reply == QMessageBox.Yes:
-            success_count = 0
-            for idx in rows:
-                loan_data = self.model._data[idx.row()]
-                loan_id = loan_data['id']
-                
-                if LoanService.return_book(loan_id):
-                    success_count += 1
+            # One transaction for the whole selection
+            outcomes = LoanService.return_books(loan_ids)
+            success_count = sum(1 for ok, _ in outcomes.values() if ok)
             
-            self.refresh_data()
+            self.refresh_if_stale()
             
             if success_count < count:
                 QMessageBox.warning(self, "Info", f"Hanya {success_count} dari {count} berhasil diproses")
@@ -114,10 +163,19 @@ class LoansPage(BasePage):
             data = dialog.get_data()
             if not data: return
             
-            success, message = LoanService.borrow_book(data['member_id'], data['book_id'])
+            # Whole cart in one transaction
+            outcomes = LoanService.borrow_books(data['member_id'], data['book_ids'])
+            failed = [message for ok, message in outcomes.values() if not ok]
+            success_count = len(outcomes) - len(failed)
             
-            if success:
-                self.refresh_data()
-                QMessageBox.information(self, "Sukses", message)
+            if success_count:
+                self.refresh_if_stale()
+            if not failed:
+                QMessageBox.information(self, "Sukses", f"{success_count} buku berhasil dipinjam")
+            elif success_count:
+                QMessageBox.warning(
+                    self, "Info",
+                    f"Hanya {success_count} dari {len(outcomes)} buku berhasil dipinjam:\n" + "\n".join(failed)
+                )
             else:
-                QMessageBox.critical(self, "Gagal", message)
+                QMessageBox.critical(self, "Gagal", "\n".join(dict.fromkeys(failed)))
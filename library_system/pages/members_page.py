@@ -6,12 +6,17 @@ from PySide6.QtGui import QAction
 from PySide6.QtCore import Qt
 from library_system.models.member_model import MemberTableModel
 from library_system.services.member_service import MemberService
+from library_system.services.events import LoanCreated, LoanReturned, MemberChanged, MemberStatusChanged
 from library_system.ui.member_dialog import MemberDialog
 from library_system.ui.delegates import StatusDelegate
+from library_system.ui.debounced_search import DebouncedSearch
 
 from library_system.pages.base_page import BasePage
 
 class MembersPage(BasePage):
+    SEARCH_LIMIT = 500
+    data_tables = ("members",)
+
     def __init__(self):
         super().__init__()
         self.layout = QVBoxLayout(self)
@@ -24,7 +29,6 @@ class MembersPage(BasePage):
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Cari nama, kode, email...")
         self.search_input.setFixedWidth(250)
-        self.search_input.textChanged.connect(self.on_search_changed)
         
         # Actions Buttons
         self.select_all_btn = QPushButton("Select All")
@@ -80,6 +84,8 @@ class MembersPage(BasePage):
 
         self.model = MemberTableModel()
         self.table_view.setModel(self.model)
+        # Evicted pages and further pages load in the background
+        self.model.set_loader(self.run_query)
         self.table_view.selectionModel().selectionChanged.connect(self.on_selection_changed)
 
         # Set Delegates
@@ -95,8 +101,12 @@ class MembersPage(BasePage):
         # Initialize Actions
         self.setup_actions()
 
-        # Load Data
-        self.refresh_data()
+        # Inactive members are searchable too
+        self.search = DebouncedSearch(
+            self, self.search_input, MemberService.search_members, MemberService.matches_search,
+            on_results=self.on_search_results, on_cleared=self.refresh_data,
+            limit=self.SEARCH_LIMIT, active_only=False
+        )
 
     def setup_actions(self):
         self.select_all_action = QAction("Select All", self)
@@ -107,22 +117,75 @@ class MembersPage(BasePage):
         self.clear_selection_action.triggered.connect(self.clear_selection)
 
     def refresh_data(self):
-        # Fetch ALL members to show inactive ones too
-        members = MemberService.get_all_members(active_only=False)
-        self.model.update_data(members)
-        
-        # Count active vs inactive
-        active_count = sum(1 for m in members if str(m.get('is_active', 1)) == '1')
-        self.status_label.setText(f"{active_count} Aktif / {len(members)} Total")
+        # Keep an active search instead of replacing it with the full list
+        if self.search.is_active():
+            self.search.invalidate()
+            self.search.search_now()
+            return
+        # Show inactive members too. First page only, the rest streams in on scroll
+        self.run_query(
+            MemberService.get_members_page, None, MemberTableModel.PAGE_SIZE, active_only=False,
+            on_result=self.on_members_loaded
+        )
+        self.run_query(MemberService.count_members, on_result=self.on_counts_loaded)
+
+    def on_members_loaded(self, first_page):
+        # A search may have been started while the full list was loading
+        if self.search_input.text().strip():
+            return
+        # Same bound method every time, so the model diffs instead of resetting
+        self.model.set_source(self.fetch_members_page, first_page)
         self.clear_selection()
 
-    def on_search_changed(self, text):
-        if len(text) > 0:
-            members = MemberService.search_members(text, active_only=False)
-        else:
-            members = MemberService.get_all_members(active_only=False)
+    def fetch_members_page(self, cursor, size):
+        return MemberService.get_members_page(cursor, size, active_only=False)
+
+    def apply_event(self, event):
+        if isinstance(event, (LoanCreated, LoanReturned)):
+            # Only members.active_loans changed, which the list doesn't show
+            return True
+        # Cached search results may be out of date now
+        self.search.invalidate()
+        if isinstance(event, MemberChanged):
+            if self.search.is_active():
+                # Whether a new or edited member matches, and how it ranks, needs the search
+                return False
+            if event.change == "created":
+                self.run_query(MemberService.get_members_by_ids, event.member_ids, on_result=self.on_members_created)
+                self.run_query(MemberService.count_members, on_result=self.on_counts_loaded)
+                return True
+
+        # Edits and status changes: refetch only the rows on screen
+        member_ids = tuple(member_id for member_id in event.member_ids if self.model.find_row(member_id) >= 0)
+        if member_ids:
+            self.run_query(MemberService.get_members_by_ids, member_ids, on_result=self.on_members_patched)
+        if isinstance(event, MemberStatusChanged):
+            self.run_query(MemberService.count_members, on_result=self.on_counts_loaded)
+        return True
+
+    def on_members_created(self, members):
+        # Newest first, so new members go on top
+        if not self.model.insert_rows(0, members):
+            self.reload_when_needed()
+
+    def on_members_patched(self, members):
+        self.model.patch_rows(members)
+        # Buttons depend on the status of the selected rows
+        self.on_selection_changed(None, None)
+
+    def on_counts_loaded(self, counts):
+        # Count active vs inactive
+        if not self.search_input.text().strip():
+            self.status_label.setText(f"{counts['active']} Aktif / {counts['total']} Total")
+
+    def on_loading_changed(self, loading):
+        if loading:
+            self.status_label.setText("Memuat data...")
+
+    def on_search_results(self, members, elapsed_ms, from_cache):
         self.model.update_data(members)
-        self.status_label.setText(f"{len(members)} data ditemukan")
+        source = "cache" if from_cache else "db"
+        self.status_label.setText(f"{len(members)} data ditemukan ({elapsed_ms:.0f} ms, {source})")
 
     def on_selection_changed(self, selected, deselected):
         rows = self.table_view.selectionModel().selectedRows()
@@ -135,7 +198,11 @@ class MembersPage(BasePage):
         
         if count > 0:
             for idx in rows:
-                row_data = self.model._data[idx.row()]
+                row_data = self.model.row_data(idx.row())
+                if row_data is None:
+                    # Row still loading: status unknown
+                    all_active = all_inactive = False
+                    break
                 is_active = str(row_data.get('is_active', 1)) == '1'
                 if is_active:
                     all_inactive = False
@@ -199,7 +266,7 @@ class MembersPage(BasePage):
                 data['member_code'], data['name'], data['email'], 
                 data['phone'], data['address']
             ):
-                self.refresh_data()
+                self.refresh_if_stale()
             else:
                 QMessageBox.critical(self, "Error", "Gagal menyimpan anggota (Kode mungkin duplikat)")
 
@@ -207,7 +274,10 @@ class MembersPage(BasePage):
         rows = self.table_view.selectionModel().selectedRows()
         if len(rows) != 1: return
         
-        member_data = self.model._data[rows[0].row()]
+        member_data = self.model.row_data(rows[0].row())
+        if member_data is None:
+            # Row still loading
+            return
         dialog = MemberDialog(self, member_data=member_data)
         if dialog.exec():
             data = dialog.get_data()
@@ -216,15 +286,17 @@ class MembersPage(BasePage):
                 data['member_code'], data['name'], data['email'], 
                 data['phone'], data['address']
             ):
-                self.refresh_data()
+                self.refresh_if_stale()
             else:
                 QMessageBox.critical(self, "Error", "Gagal mengupdate anggota")
 
     def toggle_member_status(self):
         rows = self.table_view.selectionModel().selectedRows()
-        if not rows: return
+        # Rows whose page is still loading are skipped
+        member_ids = [member['id'] for member in (self.model.row_data(idx.row()) for idx in rows) if member is not None]
+        if not member_ids: return
         
-        count = len(rows)
+        count = len(member_ids)
         mode = getattr(self, "status_action_mode", "deactivate")
         
         action_verb = "menonaktifkan" if mode == "deactivate" else "mengaktifkan"
@@ -236,19 +308,11 @@ class MembersPage(BasePage):
         )
         
         if reply == QMessageBox.Yes:
-            success_count = 0
-            for idx in rows:
-                member_data = self.model._data[idx.row()]
-                member_id = member_data['id']
-                
-                if mode == "deactivate":
-                    if MemberService.delete_member(member_id):
-                        success_count += 1
-                else:
-                    if MemberService.activate_member(member_id):
-                        success_count += 1
+            # One transaction for the whole selection
+            outcomes = MemberService.set_members_active(member_ids, active=(mode != "deactivate"))
+            success_count = sum(1 for ok, _ in outcomes.values() if ok)
                         
-            self.refresh_data()
+            self.refresh_if_stale()
             
             if success_count < count:
                 QMessageBox.warning(self, "Info", f"Hanya {success_count} dari {count} berhasil diproses")
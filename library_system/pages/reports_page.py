@@ -1,16 +1,21 @@
+from datetime import date
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, 
     QTabWidget, QTableView, QHeaderView, QAbstractItemView, QPushButton,
     QDateEdit, QFormLayout, QGroupBox, QSplitter
 )
 from PySide6.QtCore import Qt, QDate
-from PySide6.QtGui import QStandardItemModel, QStandardItem, QColor
+from PySide6.QtGui import QColor
 from library_system.pages.base_page import BasePage
+from library_system.models.report_model import ReportTableModel
 from library_system.services.report_service import ReportService
+from library_system.services.report_cache import ReportCache
 from library_system.managers.settings_manager import SettingsManager
 from library_system.utils.export_utils import ExportUtils
 
 class ReportsPage(BasePage):
+    data_tables = ("books", "loans", "members")
+
     def __init__(self):
         super().__init__()
         self.layout = QVBoxLayout(self)
@@ -35,6 +40,22 @@ class ReportsPage(BasePage):
         self.init_overdue_tab()
         self.init_members_tab()
         self.init_books_tab()
+
+        # Report cache effectiveness, updated after each load
+        self.cache_label = QLabel()
+        self.cache_label.setStyleSheet("color: #7F8C8D; padding-right: 8px;")
+        self.tabs.setCornerWidget(self.cache_label, Qt.TopRightCorner)
+
+        # Loader per tab, in tab order. Tabs load when they are opened
+        self._tab_loaders = [
+            self.load_summary,
+            self.load_loans_report,
+            self.load_overdue_report,
+            self.load_members_report,
+            self.load_books_report,
+        ]
+        self._stale_tabs = set()
+        self.tabs.currentChanged.connect(self.on_tab_changed)
         
         self.layout.addWidget(self.tabs)
 
@@ -48,8 +69,7 @@ class ReportsPage(BasePage):
         
         self.members_table = QTableView()
         self.setup_table(self.members_table)
-        self.members_model = QStandardItemModel()
-        self.members_model.setHorizontalHeaderLabels(["Nama", "Kode Anggota", "Total Peminjaman"])
+        self.members_model = ReportTableModel(["Nama", "Kode Anggota", "Total Peminjaman"])
         self.members_table.setModel(self.members_model)
         
         l.addWidget(self.members_table)
@@ -122,7 +142,7 @@ class ReportsPage(BasePage):
         btn_filter.clicked.connect(self.load_loans_report)
         
         btn_export = QPushButton("Export CSV")
-        btn_export.clicked.connect(lambda: ExportUtils.export_table_to_csv(self, self.loans_table, "laporan_peminjaman.csv"))
+        btn_export.clicked.connect(self.export_loans_report)
         
         filter_layout.addWidget(QLabel("Dari:"))
         filter_layout.addWidget(self.date_start)
@@ -137,8 +157,7 @@ class ReportsPage(BasePage):
         # Table
         self.loans_table = QTableView()
         self.setup_table(self.loans_table)
-        self.loans_model = QStandardItemModel()
-        self.loans_model.setHorizontalHeaderLabels(["ID", "Buku", "Anggota", "Tgl Pinjam", "Tgl Kembali", "Status"])
+        self.loans_model = ReportTableModel(["ID", "Buku", "Anggota", "Tgl Pinjam", "Tgl Kembali", "Status"])
         self.loans_table.setModel(self.loans_model)
         
         layout.addWidget(self.loans_table)
@@ -151,7 +170,7 @@ class ReportsPage(BasePage):
         # Actions
         action_layout = QHBoxLayout()
         btn_export = QPushButton("Export CSV")
-        btn_export.clicked.connect(lambda: ExportUtils.export_table_to_csv(self, self.overdue_table, "laporan_keterlambatan.csv"))
+        btn_export.clicked.connect(self.export_overdue_report)
         action_layout.addStretch()
         action_layout.addWidget(btn_export)
         layout.addLayout(action_layout)
@@ -159,8 +178,11 @@ class ReportsPage(BasePage):
         # Table
         self.overdue_table = QTableView()
         self.setup_table(self.overdue_table)
-        self.overdue_model = QStandardItemModel()
-        self.overdue_model.setHorizontalHeaderLabels(["ID", "Member", "Buku", "Tgl Pinjam", "Hari Terlambat", "Est. Denda"])
+        # Every overdue row is shown in red
+        self.overdue_model = ReportTableModel(
+            ["ID", "Member", "Buku", "Tgl Pinjam", "Hari Terlambat", "Est. Denda"],
+            foreground=QColor("#C0392B")
+        )
         self.overdue_table.setModel(self.overdue_model)
         
         layout.addWidget(self.overdue_table)
@@ -177,8 +199,7 @@ class ReportsPage(BasePage):
         l_pop = QVBoxLayout(gb_pop)
         self.pop_table = QTableView()
         self.setup_table(self.pop_table)
-        self.pop_model = QStandardItemModel()
-        self.pop_model.setHorizontalHeaderLabels(["Judul", "Penulis", "Total Peminjaman"])
+        self.pop_model = ReportTableModel(["Judul", "Penulis", "Total Peminjaman"])
         self.pop_table.setModel(self.pop_model)
         l_pop.addWidget(self.pop_table)
         
@@ -187,8 +208,7 @@ class ReportsPage(BasePage):
         l_dead = QVBoxLayout(gb_dead)
         self.dead_table = QTableView()
         self.setup_table(self.dead_table)
-        self.dead_model = QStandardItemModel()
-        self.dead_model.setHorizontalHeaderLabels(["Judul", "Penulis", "Kategori", "Stok"])
+        self.dead_model = ReportTableModel(["Judul", "Penulis", "Kategori", "Stok"])
         self.dead_table.setModel(self.dead_model)
         l_dead.addWidget(self.dead_table)
         
@@ -205,12 +225,43 @@ class ReportsPage(BasePage):
         table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         table.setSelectionBehavior(QAbstractItemView.SelectRows)
 
+    def data_version(self, excluding=None):
+        # Overdue days and fines also depend on the date and the fine setting
+        fine_per_day = SettingsManager().get("loans/fine_per_day", int)
+        return (super().data_version(excluding), date.today(), fine_per_day)
+
     def refresh_data(self):
-        # 1. Summary Stats
-        settings = SettingsManager()
-        fine_per_day = settings.get("loans/fine_per_day", int)
-        stats = ReportService.get_summary_stats(fine_per_day)
-        
+        # Every tab is out of date, but only the visible one is loaded now;
+        # the others reload when they are opened
+        self._stale_tabs = set(range(len(self._tab_loaders)))
+        self.load_tab(self.tabs.currentIndex())
+
+    def on_tab_changed(self, index):
+        if index in self._stale_tabs:
+            self.load_tab(index)
+
+    def load_tab(self, index):
+        if 0 <= index < len(self._tab_loaders):
+            self._stale_tabs.discard(index)
+            self._tab_loaders[index]()
+
+    def load_summary(self):
+        fine_per_day = SettingsManager().get("loans/fine_per_day", int)
+        self.run_query(ReportService.get_summary_stats, fine_per_day, on_result=self.on_summary_loaded)
+
+    def on_loading_changed(self, loading):
+        if not loading:
+            self.update_cache_label()
+
+    def update_cache_label(self):
+        stats = ReportCache().stats()
+        lookups = stats['hits'] + stats['misses']
+        self.cache_label.setText(
+            f"Cache: {stats['hit_rate']:.0%} hit ({stats['hits']}/{lookups})"
+        )
+        self.cache_label.setToolTip(f"{stats['entries']} laporan tersimpan, {stats['rows']} baris")
+
+    def on_summary_loaded(self, stats):
         self.card_total_books.value_label.setText(str(stats['total_books']))
         self.card_active_members.value_label.setText(str(stats['active_members']))
         self.card_active_loans.value_label.setText(str(stats['active_loans']))
@@ -219,83 +270,86 @@ class ReportsPage(BasePage):
         # Format Currency
         fines = stats.get('total_fines', 0)
         self.card_fines.value_label.setText(f"Rp {fines:,}")
-        
-        # 2. Tabs Data
-        self.load_loans_report()
-        self.load_overdue_report(fine_per_day)
-        self.load_members_report()
-        self.load_books_report()
 
     def load_members_report(self):
-        active_members = ReportService.get_active_members(10)
-        self.members_model.removeRows(0, self.members_model.rowCount())
-        for m in active_members:
-            row = [
-                QStandardItem(m['name']),
-                QStandardItem(m['member_code']),
-                QStandardItem(str(m['borrow_count']))
-            ]
-            self.members_model.appendRow(row)
+        self.run_query(ReportService.get_active_members, 10, on_result=self.fill_members_report)
+
+    def fill_members_report(self, active_members):
+        self.members_model.set_rows([
+            (m['name'], m['member_code'], m['borrow_count'])
+            for m in active_members
+        ])
 
     def load_loans_report(self):
         s_date = self.date_start.date().toString("yyyy-MM-dd")
         e_date = self.date_end.date().toString("yyyy-MM-dd")
         
-        loans = ReportService.get_loans_by_period(s_date, e_date)
-        self.loans_model.removeRows(0, self.loans_model.rowCount())
-        
-        for l in loans:
-            row = [
-                QStandardItem(str(l['id'])),
-                QStandardItem(l['title']),
-                QStandardItem(l['name']),
-                QStandardItem(l['loan_date']),
-                QStandardItem(l['return_date'] or "-"),
-                QStandardItem(l['status'])
-            ]
-            self.loans_model.appendRow(row)
-
-    def load_overdue_report(self, fine_per_day):
-        overdue = ReportService.get_overdue_loans()
-        self.overdue_model.removeRows(0, self.overdue_model.rowCount())
-        
-        for o in overdue:
-            days = o['days_overdue']
-            est_fine = days * fine_per_day
-            
-            row = [
-                QStandardItem(str(o['id'])),
-                QStandardItem(o['member_name']),
-                QStandardItem(o['book_title']),
-                QStandardItem(o['loan_date']),
-                QStandardItem(str(days)),
-                QStandardItem(f"Rp {est_fine:,}")
-            ]
-            # Color red
-            for item in row: item.setForeground(QColor("#C0392B"))
-            
-            self.overdue_model.appendRow(row)
+        period = (s_date, e_date)
+        self._loans_period = period
+
+        def apply(loans):
+            # Ignore an older filter that finished after a newer one was applied
+            if period == self._loans_period:
+                self.fill_loans_report(loans)
+
+        self.run_query(ReportService.get_loans_by_period, s_date, e_date, on_result=apply)
+
+    def fill_loans_report(self, loans):
+        self.loans_model.set_rows([
+            (l['id'], l['title'], l['name'], l['loan_date'], l['return_date'] or "-", l['status'])
+            for l in loans
+        ])
+
+    def export_loans_report(self):
+        # Export the period shown in the table, streamed straight from SQL;
+        # the table's row count is only used for the progress bar
+        period = getattr(self, "_loans_period", None)
+        total = self.loans_model.rowCount()
+        if period is None:
+            period = (self.date_start.date().toString("yyyy-MM-dd"), self.date_end.date().toString("yyyy-MM-dd"))
+            total = None
+        ExportUtils.export_query_to_csv(
+            self, [h.title() for h in self.loans_model.headers()],
+            ReportService.iter_loans_by_period, *period,
+            filename="laporan_peminjaman.csv", total=total
+        )
+
+    def load_overdue_report(self):
+        fine_per_day = SettingsManager().get("loans/fine_per_day", int)
+        self.run_query(
+            ReportService.get_overdue_loans,
+            on_result=lambda overdue: self.fill_overdue_report(overdue, fine_per_day)
+        )
+
+    def export_overdue_report(self):
+        fine_per_day = SettingsManager().get("loans/fine_per_day", int)
+        ExportUtils.export_query_to_csv(
+            self, [h.title() for h in self.overdue_model.headers()],
+            ReportService.iter_overdue_loans, fine_per_day,
+            filename="laporan_keterlambatan.csv", total=self.overdue_model.rowCount() or None
+        )
+
+    def fill_overdue_report(self, overdue, fine_per_day):
+        self.overdue_model.set_rows([
+            (o['id'], o['member_name'], o['book_title'], o['loan_date'],
+             o['days_overdue'], f"Rp {o['days_overdue'] * fine_per_day:,}")
+            for o in overdue
+        ])
 
     def load_books_report(self):
+        self.run_query(ReportService.get_popular_books, 20, on_result=self.fill_popular_books)
+        self.run_query(ReportService.get_never_borrowed_books, on_result=self.fill_never_borrowed_books)
+
+    def fill_popular_books(self, popular):
         # Popular
-        popular = ReportService.get_popular_books(20)
-        self.pop_model.removeRows(0, self.pop_model.rowCount())
-        for p in popular:
-            row = [
-                QStandardItem(p['title']),
-                QStandardItem(p['author']),
-                QStandardItem(str(p['borrow_count']))
-            ]
-            self.pop_model.appendRow(row)
-            
+        self.pop_model.set_rows([
+            (p['title'], p['author'], p['borrow_count'])
+            for p in popular
+        ])
+
+    def fill_never_borrowed_books(self, dead_stock):
         # Never Borrowed
-        dead_stock = ReportService.get_never_borrowed_books()
-        self.dead_model.removeRows(0, self.dead_model.rowCount())
-        for d in dead_stock:
-            row = [
-                QStandardItem(d['title']),
-                QStandardItem(d['author']),
-                QStandardItem(d.get('category') or "-"),
-                QStandardItem(str(d['stock']))
-            ]
-            self.dead_model.appendRow(row)
+        self.dead_model.set_rows([
+            (d['title'], d['author'], d.get('category') or "-", d['stock'])
+            for d in dead_stock
+        ])
@@ -1,4 +1,4 @@
-import shutil
+import sqlite3
 import sys
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, 
@@ -7,10 +7,14 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt, Signal
 from library_system.managers.settings_manager import SettingsManager
-from library_system.database.db import get_db_path
+from library_system.database.db import (
+    get_db_path, db_connection,
+    PERFORMANCE_PROFILES, measure_commit_latency
+)
 from pathlib import Path
 
 from library_system.pages.base_page import BasePage
+from library_system.utils.export_utils import ExportUtils
 
 class SettingsPage(BasePage):
     settings_updated = Signal()
@@ -151,9 +155,31 @@ class SettingsPage(BasePage):
         restore_btn.clicked.connect(self.restore_database)
         restore_btn.setStyleSheet("color: #E67E22;") # Keep warning color hint
 
+        # Performance profile (journal mode, fsync level, cache sizes)
+        self.inp_db_profile = QComboBox()
+        self.inp_db_profile.addItems(list(PERFORMANCE_PROFILES.keys()))
+        self.inp_db_profile.setCurrentText(self.settings.get("system/db_profile", str))
+
+        self.bench_btn = QPushButton("Ukur Latensi Commit")
+        self.bench_btn.setObjectName("secondary-btn")
+        self.bench_btn.clicked.connect(self.benchmark_profiles)
+
+        # Typed columnar dump of a table for analysis (pandas, DuckDB, ...)
+        export_row = QHBoxLayout()
+        self.inp_export_dataset = QComboBox()
+        self.inp_export_dataset.addItems(["books", "members", "loans"])
+        export_btn = QPushButton("Export Parquet / Feather")
+        export_btn.setObjectName("secondary-btn")
+        export_btn.clicked.connect(self.export_dataset)
+        export_row.addWidget(self.inp_export_dataset)
+        export_row.addWidget(export_btn)
+
         layout.addRow("Lokasi Database:", db_path_lbl)
+        layout.addRow("Profil Performa DB:", self.inp_db_profile)
+        layout.addRow("", self.bench_btn)
         layout.addRow("", backup_btn)
         layout.addRow("", restore_btn)
+        layout.addRow("Export Data:", export_row)
         
         self.tabs.addTab(tab, "Sistem")
 
@@ -176,6 +202,9 @@ class SettingsPage(BasePage):
         self.settings.set("loans/fine_enabled", self.inp_fine_enabled.isChecked())
         self.settings.set("loans/fine_per_day", self.inp_fine_amount.value())
 
+        # System (ConnectionManager switches profile on setting_changed)
+        self.settings.set("system/db_profile", self.inp_db_profile.currentText())
+
         self.settings_updated.emit()
         QMessageBox.information(self, "Sukses", "Pengaturan berhasil disimpan!")
 
@@ -190,6 +219,38 @@ class SettingsPage(BasePage):
         # 2. Apply immediately
         ThemeManager.apply_theme(theme_code)
 
+    def benchmark_profiles(self):
+        # fsync-heavy, so measured in the background, one profile at a time
+        # (in parallel they would slow each other down)
+        self.bench_btn.setEnabled(False)
+        self._bench_pending = list(PERFORMANCE_PROFILES)
+        self._bench_results = []
+        self._run_next_benchmark()
+
+    def _run_next_benchmark(self):
+        if not self._bench_pending:
+            self.bench_btn.setText("Ukur Latensi Commit")
+            self.bench_btn.setEnabled(True)
+            lines = [f"{r['profile']}: rata-rata {r['mean_ms']:.2f} ms, p95 {r['p95_ms']:.2f} ms"
+                     for r in self._bench_results]
+            QMessageBox.information(self, "Latensi Commit", "\n".join(lines))
+            return
+        done = len(self._bench_results)
+        self.bench_btn.setText(f"Mengukur... ({done + 1}/{done + len(self._bench_pending)})")
+        self.run_query(
+            measure_commit_latency, self._bench_pending.pop(0), iterations=100,
+            on_result=self._on_benchmark_result, on_error=self._on_benchmark_failed
+        )
+
+    def _on_benchmark_result(self, result):
+        self._bench_results.append(result)
+        self._run_next_benchmark()
+
+    def _on_benchmark_failed(self, message):
+        self.bench_btn.setText("Ukur Latensi Commit")
+        self.bench_btn.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Gagal mengukur latensi: {message}")
+
     def backup_database(self):
         src = Path(get_db_path())
         if not src.exists():
@@ -199,11 +260,20 @@ class SettingsPage(BasePage):
         dest, _ = QFileDialog.getSaveFileName(self, "Save Backup", "library_backup.db", "SQLite Database (*.db)")
         if dest:
             try:
-                shutil.copy2(src, dest)
+                # Online backup API: includes pages still sitting in the WAL file
+                with db_connection() as conn:
+                    target = sqlite3.connect(dest)
+                    try:
+                        conn.backup(target)
+                    finally:
+                        target.close()
                 QMessageBox.information(self, "Success", "Database backup created successfully.")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to backup: {e}")
 
+    def export_dataset(self):
+        ExportUtils.export_dataset(self, self.inp_export_dataset.currentText())
+
     def restore_database(self):
         src, _ = QFileDialog.getOpenFileName(self, "Select Backup", "", "SQLite Database (*.db)")
         if src:
@@ -215,8 +285,15 @@ class SettingsPage(BasePage):
             
             if confirm == QMessageBox.Yes:
                 try:
-                    dest = Path(get_db_path())
-                    shutil.copy2(src, dest)
+                    # Copied through the live connection with the backup API: a
+                    # plain file copy would be undone when a worker connection
+                    # still open on the old file checkpoints its WAL on close
+                    source = sqlite3.connect(Path(src).as_uri() + "?mode=ro", uri=True)
+                    try:
+                        with db_connection() as conn:
+                            source.backup(conn)
+                    finally:
+                        source.close()
                     QMessageBox.information(self, "Sukses", "Database berhasil di-restore. Aplikasi akan ditutup.")
                     sys.exit(0)
                 except Exception as e:
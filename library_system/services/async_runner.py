@@ -0,0 +1,169 @@
+import itertools
+import threading
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot
+from library_system.database.db import ConnectionManager, cancellable
+
+# Error message delivered to on_error when a query was cancelled
+CANCELLED = "cancelled"
+
+class _TaskSignals(QObject):
+    # (ticket, result) / (ticket, error message)
+    finished = Signal(int, object)
+    failed = Signal(int, str)
+
+class _QueryTask(QRunnable):
+    """Runs one service call on a pool thread."""
+    def __init__(self, ticket, fn, args, kwargs):
+        super().__init__()
+        # The runner owns the task (AsyncRunner._tasks); if Qt deleted it after
+        # run(), cancel() would call tryTake on a dead object
+        self.setAutoDelete(False)
+        self.ticket = ticket
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        # Set by AsyncRunner.cancel(); aborts the running SQLite statement
+        self.cancel_event = threading.Event()
+        # Created on the GUI thread, so emits are queued back to it
+        self.signals = _TaskSignals()
+
+    def run(self):
+        try:
+            with cancellable(self.cancel_event):
+                result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(self.ticket, str(e))
+            return
+        self.signals.finished.emit(self.ticket, result)
+
+
+class AsyncRunner(QObject):
+    """
+    Runs (synchronous) service calls on a thread pool and delivers the result
+    on the GUI thread.
+
+    Identical requests that are still running are merged: the service is
+    called once and every caller receives the same result. Services stay
+    plain synchronous functions, so scripts can keep calling them directly.
+
+    A running request can be cancelled by key; its callers get on_error(CANCELLED).
+    A caller-chosen key only merges with a running request for the same
+    call; starting a different call under a running key is an error.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(AsyncRunner, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        super().__init__()
+        self._initialized = True
+        self.pool = QThreadPool()
+        # One worker per pooled DB connection, so workers never queue for a connection
+        self.pool.setMaxThreadCount(ConnectionManager.POOL_SIZE)
+        self._inflight = {}  # key -> ticket of the task new callers can join
+        self._tasks = {}     # ticket -> (key, task, [(on_result, on_error), ...])
+        self._tickets = itertools.count()
+        self.merged_count = 0
+        self.cancelled_count = 0
+
+    @staticmethod
+    def make_key(fn, args, kwargs):
+        return (getattr(fn, "__qualname__", repr(fn)), args, tuple(sorted(kwargs.items())))
+
+    def run(self, fn, *args, key=None, on_result=None, on_error=None, **kwargs):
+        """
+        Call fn(*args, **kwargs) in the background.
+        on_result(result) / on_error(message) are invoked on the GUI thread.
+        Raises RuntimeError if `key` is running a different call.
+        """
+        call = self.make_key(fn, args, kwargs)
+        if key is None:
+            key = call
+
+        ticket = self._inflight.get(key)
+        if ticket is not None:
+            _, task, callbacks = self._tasks[ticket]
+            if self.make_key(task.fn, task.args, task.kwargs) != call:
+                raise RuntimeError(f"{key!r} is already running a different request")
+            callbacks.append((on_result, on_error))
+            self.merged_count += 1
+            return key
+
+        ticket = next(self._tickets)
+        task = _QueryTask(ticket, fn, args, kwargs)
+        task.signals.finished.connect(self._on_finished)
+        task.signals.failed.connect(self._on_failed)
+        self._inflight[key] = ticket
+        self._tasks[ticket] = (key, task, [(on_result, on_error)])
+        self.pool.start(task)
+        return key
+
+    def is_running(self, key):
+        return key in self._inflight
+
+    def cancel(self, key):
+        """
+        Cancel the request running under `key`. A queued task is dropped, a
+        running one is interrupted at its next SQLite progress check.
+        Returns False if nothing was running under that key.
+        """
+        ticket = self._inflight.pop(key, None)
+        if ticket is None:
+            return False
+        _, task, callbacks = self._tasks[ticket]
+        task.cancel_event.set()
+        self.cancelled_count += 1
+        # Never started: no signal will come, so answer the callers here
+        if self.pool.tryTake(task):
+            del self._tasks[ticket]
+            self._notify_error(callbacks, CANCELLED)
+        return True
+
+    def _take(self, ticket):
+        entry = self._tasks.pop(ticket, None)
+        if entry is not None and self._inflight.get(entry[0]) == ticket:
+            del self._inflight[entry[0]]
+        return entry
+
+    @staticmethod
+    def _notify_error(callbacks, message):
+        for _, on_error in callbacks:
+            if on_error:
+                on_error(message)
+
+    @Slot(int, object)
+    def _on_finished(self, ticket, result):
+        entry = self._take(ticket)
+        if entry is None:
+            return
+        _, task, callbacks = entry
+        # Finished before the interrupt landed; the result is stale anyway
+        if task.cancel_event.is_set():
+            self._notify_error(callbacks, CANCELLED)
+            return
+        for on_result, _ in callbacks:
+            if on_result:
+                on_result(result)
+
+    @Slot(int, str)
+    def _on_failed(self, ticket, message):
+        entry = self._take(ticket)
+        if entry is None:
+            return
+        _, task, callbacks = entry
+        if task.cancel_event.is_set():
+            message = CANCELLED
+        else:
+            print(f"Background query failed: {message}")
+        self._notify_error(callbacks, message)
+
+    def shutdown(self, timeout_ms=5000):
+        """Wait for running queries (call before closing DB connections)."""
+        self.pool.clear()
+        self.pool.waitForDone(timeout_ms)
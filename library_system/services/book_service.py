@@ -1,12 +1,17 @@
-from library_system.database.db import create_connection
+import sqlite3
+from library_system.database.counters import read_counter
+from library_system.database.db import (
+    db_connection, fts_match_expression, split_page,
+    fts_prefix_match, query_cancelled, chunked
+)
+from library_system.services.events import EventBus, BookChanged
 
 class BookService:
     @staticmethod
     def get_all_books():
-        conn = create_connection()
         books = []
-        if conn:
-            try:
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
                 query = """
                     SELECT b.id, b.title, b.author, b.publisher, b.year, b.stock, c.name as category
@@ -16,19 +21,101 @@ class BookService:
                 """
                 cursor.execute(query)
                 books = [dict(row) for row in cursor.fetchall()]
-            except Exception as e:
-                print(f"Error fetching books: {e}")
-            finally:
-                conn.close()
+        except Exception as e:
+            print(f"Error fetching books: {e}")
         return books
 
     @staticmethod
-    def search_books(keyword):
-        conn = create_connection()
+    def get_books_page(cursor=None, page_size=100):
+        """
+        One page of the book list, newest first (keyset pagination).
+        cursor: (created_at, id) of the previous page's last row, None for the first page.
+        Returns (books, next_cursor); next_cursor is None on the last page.
+        """
+        books, next_cursor = [], None
+        try:
+            with db_connection() as conn:
+                cursor_sql = ""
+                params = []
+                if cursor:
+                    # Row-value comparison continues right after the previous page via idx_books_created_at
+                    cursor_sql = "WHERE (b.created_at, b.id) < (?, ?)"
+                    params.extend(cursor)
+                query = f"""
+                    SELECT b.id, b.title, b.author, b.publisher, b.year, b.stock, c.name as category,
+                           b.created_at
+                    FROM books b
+                    LEFT JOIN categories c ON b.category_id = c.id
+                    {cursor_sql}
+                    ORDER BY b.created_at DESC, b.id DESC
+                    LIMIT ?
+                """
+                params.append(page_size + 1)
+                rows = [dict(row) for row in conn.execute(query, params).fetchall()]
+                books, next_cursor = split_page(rows, page_size, ("created_at", "id"))
+        except Exception as e:
+            print(f"Error fetching books page: {e}")
+        return books, next_cursor
+
+    @staticmethod
+    def get_books_by_ids(book_ids):
+        """Rows for the given books, shaped and ordered like get_books_page (for patching views)."""
+        books = []
+        try:
+            with db_connection() as conn:
+                for chunk, placeholders in chunked(book_ids):
+                    books.extend(dict(row) for row in conn.execute(f"""
+                        SELECT b.id, b.title, b.author, b.publisher, b.year, b.stock, c.name as category,
+                               b.created_at
+                        FROM books b
+                        LEFT JOIN categories c ON b.category_id = c.id
+                        WHERE b.id IN ({placeholders})
+                    """, chunk))
+        except Exception as e:
+            print(f"Error fetching books: {e}")
+        books.sort(key=lambda book: (book['created_at'], book['id']), reverse=True)
+        return books
+
+    @staticmethod
+    def estimate_total():
+        """Number of books from the KPI counters (cheap, for scrollbars and status text)."""
+        try:
+            with db_connection() as conn:
+                return read_counter(conn, "books_total")
+        except Exception as e:
+            print(f"Error estimating books: {e}")
+            return 0
+
+    @staticmethod
+    def search_books(keyword, limit=None):
+        """
+        Ranked catalog search (FTS5 + bm25, prefix matching on every word).
+        Falls back to a LIKE scan if the FTS index is not available.
+        """
         books = []
-        if conn:
-            try:
+        match = fts_match_expression(keyword)
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
+                if match:
+                    try:
+                        # Column weights: title > author > publisher
+                        query = """
+                            SELECT b.id, b.title, b.author, b.publisher, b.year, b.stock, c.name as category
+                            FROM books_fts f
+                            JOIN books b ON b.id = f.rowid
+                            LEFT JOIN categories c ON b.category_id = c.id
+                            WHERE books_fts MATCH ?
+                            ORDER BY bm25(books_fts, 10.0, 5.0, 1.0)
+                            LIMIT ?
+                        """
+                        cursor.execute(query, (match, limit if limit else -1))
+                        return [dict(row) for row in cursor.fetchall()]
+                    except sqlite3.OperationalError as e:
+                        if query_cancelled():
+                            raise
+                        print(f"FTS search unavailable, using LIKE: {e}")
+
                 search_term = f"%{keyword}%"
                 query = """
                     SELECT b.id, b.title, b.author, b.publisher, b.year, b.stock, c.name as category
@@ -36,20 +123,25 @@ class BookService:
                     LEFT JOIN categories c ON b.category_id = c.id
                     WHERE b.title LIKE ? OR b.author LIKE ?
                     ORDER BY b.created_at DESC
+                    LIMIT ?
                 """
-                cursor.execute(query, (search_term, search_term))
+                cursor.execute(query, (search_term, search_term, limit if limit else -1))
                 books = [dict(row) for row in cursor.fetchall()]
-            except Exception as e:
-                print(f"Error searching books: {e}")
-            finally:
-                conn.close()
+        except Exception as e:
+            if query_cancelled():
+                raise
+            print(f"Error searching books: {e}")
         return books
 
+    @staticmethod
+    def matches_search(book, keyword):
+        """True if `book` would be returned by search_books(keyword) (FTS semantics)."""
+        return fts_prefix_match(keyword, book.get('title'), book.get('author'), book.get('publisher'))
+
     @staticmethod
     def add_book(title, author, publisher, year, stock, category_id):
-        conn = create_connection()
-        if conn:
-            try:
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
                 query = """
                     INSERT INTO books (title, author, publisher, year, stock, category_id)
@@ -57,19 +149,16 @@ class BookService:
                 """
                 cursor.execute(query, (title, author, publisher, int(year), int(stock), int(category_id)))
                 conn.commit()
+                EventBus().publish(BookChanged((cursor.lastrowid,), "created"))
                 return True
-            except Exception as e:
-                print(f"Error adding book: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+        except Exception as e:
+            print(f"Error adding book: {e}")
+            return False
 
     @staticmethod
     def update_book(book_id, title, author, publisher, year, stock, category_id):
-        conn = create_connection()
-        if conn:
-            try:
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
                 query = """
                     UPDATE books 
@@ -78,40 +167,57 @@ class BookService:
                 """
                 cursor.execute(query, (title, author, publisher, int(year), int(stock), int(category_id), book_id))
                 conn.commit()
+                if cursor.rowcount:
+                    EventBus().publish(BookChanged((book_id,)))
                 return True
-            except Exception as e:
-                print(f"Error updating book: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+        except Exception as e:
+            print(f"Error updating book: {e}")
+            return False
 
     @staticmethod
     def delete_book(book_id):
-        conn = create_connection()
-        if conn:
-            try:
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
                 query = "DELETE FROM books WHERE id=?"
                 cursor.execute(query, (book_id,))
                 conn.commit()
+                if cursor.rowcount:
+                    EventBus().publish(BookChanged((book_id,), "deleted"))
                 return True
-            except Exception as e:
-                print(f"Error deleting book: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+        except Exception as e:
+            print(f"Error deleting book: {e}")
+            return False
+
+    @staticmethod
+    def delete_books(book_ids):
+        """
+        Delete many books in one transaction (one DELETE per chunk of ids).
+        Returns {book_id: (success, message)}.
+        """
+        outcomes = {}
+        try:
+            with db_connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for chunk, placeholders in chunked(book_ids):
+                    found = {row[0] for row in conn.execute(
+                        f"SELECT id FROM books WHERE id IN ({placeholders})", chunk
+                    )}
+                    conn.execute(f"DELETE FROM books WHERE id IN ({placeholders})", chunk)
+                    for book_id in chunk:
+                        outcomes[book_id] = (True, "Deleted") if book_id in found else (False, "Book not found")
+                conn.commit()
+                deleted = tuple(book_id for book_id, (ok, _) in outcomes.items() if ok)
+                if deleted:
+                    EventBus().publish(BookChanged(deleted, "deleted"))
+        except Exception as e:
+            print(f"Error deleting books: {e}")
+            return {book_id: (False, str(e)) for book_id in book_ids}
+        return outcomes
     
     @staticmethod
     def get_categories():
-        conn = create_connection()
-        categories = []
-        if conn:
-            try:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM categories")
-                categories = [dict(row) for row in cursor.fetchall()]
-            finally:
-                conn.close()
-        return categories
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM categories")
+            return [dict(row) for row in cursor.fetchall()]
@@ -1,6 +1,7 @@
 import sqlite3
 from datetime import date, timedelta
-from library_system.database.db import create_connection
+from library_system.database.counters import read_counters
+from library_system.database.db import db_connection
 
 class DashboardService:
     @staticmethod
@@ -11,72 +12,59 @@ class DashboardService:
             "total_overdue": 0,
             "active_members": 0
         }
-        conn = create_connection()
-        if conn:
-            try:
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Books Available (Sum of stock)
-                cursor.execute("SELECT SUM(stock) FROM books")
-                res = cursor.fetchone()[0]
-                stats["books_available"] = res if res else 0
+                # Books available (sum of stock), borrowed and active members
+                # come from the trigger-maintained counters
+                counters = read_counters(conn, "stock_total", "loans_borrowed", "members_active")
+                stats["books_available"] = counters["stock_total"]
+                stats["books_borrowed"] = counters["loans_borrowed"]
+                stats["active_members"] = counters["members_active"]
                 
-                # Books Borrowed
-                cursor.execute("SELECT COUNT(*) FROM loans WHERE status = 'borrowed'")
-                stats["books_borrowed"] = cursor.fetchone()[0]
-                
-                # Active Members
-                cursor.execute("SELECT COUNT(*) FROM members WHERE is_active = 1")
-                stats["active_members"] = cursor.fetchone()[0]
-                
-                # Total Overdue (Status borrowed AND loan_date < 7 days ago)
+                # Total Overdue (Status borrowed AND past due date) - index range scan
                 cursor.execute("""
                     SELECT COUNT(*) FROM loans 
                     WHERE status = 'borrowed' 
-                    AND date(loan_date, '+7 days') < date('now')
-                """)
+                    AND due_date < ?
+                """, (date.today().isoformat(),))
                 stats["total_overdue"] = cursor.fetchone()[0]
                 
-            except Exception as e:
-                print(f"Error dashboard stats: {e}")
-            finally:
-                conn.close()
+        except Exception as e:
+            print(f"Error dashboard stats: {e}")
         return stats
 
     @staticmethod
     def get_urgent_tasks(limit=5):
         tasks = []
-        conn = create_connection()
-        if conn:
-            try:
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
                 # Overdue items
                 query = """
                     SELECT 
                         l.id, m.name as member_name, b.title as book_title, 
-                        date(l.loan_date, '+7 days') as due_date
+                        l.due_date
                     FROM loans l
                     JOIN books b ON l.book_id = b.id
                     JOIN members m ON l.member_id = m.id
                     WHERE l.status = 'borrowed' 
-                    AND date(l.loan_date, '+7 days') < date('now')
-                    ORDER BY due_date ASC
+                    AND l.due_date < ?
+                    ORDER BY l.due_date ASC
                     LIMIT ?
                 """
-                cursor.execute(query, (limit,))
+                cursor.execute(query, (date.today().isoformat(), limit))
                 tasks = [dict(row) for row in cursor.fetchall()]
-            except Exception as e:
-                print(f"Error urgent tasks: {e}")
-            finally:
-                conn.close()
+        except Exception as e:
+            print(f"Error urgent tasks: {e}")
         return tasks
 
     @staticmethod
     def get_recent_activity(limit=10):
         activity = []
-        conn = create_connection()
-        if conn:
-            try:
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
                 # Combine Loans and Returns
                 # We select type, date, member, book
@@ -107,8 +95,6 @@ class DashboardService:
                 """
                 cursor.execute(query, (limit,))
                 activity = [dict(row) for row in cursor.fetchall()]
-            except Exception as e:
-                print(f"Error recent activity: {e}")
-            finally:
-                conn.close()
+        except Exception as e:
+            print(f"Error recent activity: {e}")
         return activity
@@ -0,0 +1,73 @@
+"""
+Change events published by the services after a successful commit.
+
+Pages subscribe through EventBus().published and patch the rows and
+counters an event names instead of re-querying whole tables. Publishing
+also bumps the DataVersion counters of the tables the event touched, so
+pages that don't handle an event still see themselves as stale.
+"""
+from dataclasses import dataclass
+from PySide6.QtCore import QObject, Signal
+from library_system.database.data_version import DataVersion
+
+@dataclass(frozen=True)
+class BookChanged:
+    book_ids: tuple
+    change: str = "updated"  # created | updated | deleted
+    tables = ("books",)
+
+@dataclass(frozen=True)
+class MemberChanged:
+    member_ids: tuple
+    change: str = "updated"  # created | updated
+    tables = ("members",)
+
+@dataclass(frozen=True)
+class MemberStatusChanged:
+    member_ids: tuple
+    active: bool
+    tables = ("members",)
+
+@dataclass(frozen=True)
+class LoanCreated:
+    loan_ids: tuple
+    member_id: int
+    book_ids: tuple
+    # members.active_loans is kept by triggers on loans
+    tables = ("loans", "books", "members")
+
+@dataclass(frozen=True)
+class LoanReturned:
+    loan_ids: tuple
+    book_ids: tuple
+    tables = ("loans", "books", "members")
+
+
+class EventBus(QObject):
+    """
+    Process-wide publisher of change events.
+
+    Events published from a worker thread are queued to receivers on the
+    GUI thread like any other Qt signal.
+    """
+    _instance = None
+
+    # The event instance
+    published = Signal(object)
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(EventBus, cls).__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        super().__init__()
+        self._initialized = True
+
+    def publish(self, event):
+        """Announce a committed change. Call it after conn.commit()."""
+        DataVersion.bump(*event.tables)
+        self.published.emit(event)
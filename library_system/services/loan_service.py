@@ -1,14 +1,15 @@
 import sqlite3
-from datetime import date
-from library_system.database.db import create_connection
+from datetime import date, timedelta
+from library_system.database.counters import read_counter
+from library_system.database.db import db_connection, split_page, chunked, stream_query
+from library_system.services.events import EventBus, LoanCreated, LoanReturned
 
 class LoanService:
     @staticmethod
     def get_all_loans():
-        conn = create_connection()
         loans = []
-        if conn:
-            try:
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
                 # Join with books and members to get names instead of IDs
                 query = """
@@ -27,134 +28,282 @@ class LoanService:
                 """
                 cursor.execute(query)
                 loans = [dict(row) for row in cursor.fetchall()]
-            except Exception as e:
-                print(f"Error fetching loans: {e}")
-            finally:
-                conn.close()
+        except Exception as e:
+            print(f"Error fetching loans: {e}")
+        return loans
+
+    @staticmethod
+    def get_loans_page(cursor=None, page_size=100):
+        """
+        One page of the loan history, most recent first (keyset pagination).
+        cursor: (loan_date, id) of the previous page's last row, None for the first page.
+        Returns (loans, next_cursor); next_cursor is None on the last page.
+        """
+        loans, next_cursor = [], None
+        try:
+            with db_connection() as conn:
+                cursor_sql = ""
+                params = []
+                if cursor:
+                    cursor_sql = "WHERE (l.loan_date, l.id) < (?, ?)"
+                    params.extend(cursor)
+                query = f"""
+                    SELECT 
+                        l.id, 
+                        l.loan_date, 
+                        l.return_date, 
+                        l.status,
+                        b.title as book_title,
+                        m.name as member_name,
+                        m.member_code
+                    FROM loans l
+                    JOIN books b ON l.book_id = b.id
+                    JOIN members m ON l.member_id = m.id
+                    {cursor_sql}
+                    ORDER BY l.loan_date DESC, l.id DESC
+                    LIMIT ?
+                """
+                params.append(page_size + 1)
+                rows = [dict(row) for row in conn.execute(query, params).fetchall()]
+                loans, next_cursor = split_page(rows, page_size, ("loan_date", "id"))
+        except Exception as e:
+            print(f"Error fetching loans page: {e}")
+        return loans, next_cursor
+
+    @staticmethod
+    def get_loans_by_ids(loan_ids):
+        """Rows for the given loans, shaped and ordered like get_loans_page (for patching views)."""
+        loans = []
+        try:
+            with db_connection() as conn:
+                for chunk, placeholders in chunked(loan_ids):
+                    loans.extend(dict(row) for row in conn.execute(f"""
+                        SELECT 
+                            l.id, 
+                            l.loan_date, 
+                            l.return_date, 
+                            l.status,
+                            b.title as book_title,
+                            m.name as member_name,
+                            m.member_code
+                        FROM loans l
+                        JOIN books b ON l.book_id = b.id
+                        JOIN members m ON l.member_id = m.id
+                        WHERE l.id IN ({placeholders})
+                    """, chunk))
+        except Exception as e:
+            print(f"Error fetching loans: {e}")
+        loans.sort(key=lambda loan: (loan['loan_date'], loan['id']), reverse=True)
         return loans
 
+    @staticmethod
+    def iter_loan_history():
+        """
+        The whole loan history in LoansPage column order, newest first,
+        as chunks of tuples (for streaming exports). Errors are raised.
+        """
+        return stream_query("""
+            SELECT l.id, m.name, b.title, l.loan_date, COALESCE(l.return_date, '-'), l.status
+            FROM loans l
+            JOIN books b ON l.book_id = b.id
+            JOIN members m ON l.member_id = m.id
+            ORDER BY l.loan_date DESC, l.id DESC
+        """)
+
+    @staticmethod
+    def estimate_total():
+        """Number of loans from the KPI counters (cheap, for scrollbars and status text)."""
+        try:
+            with db_connection() as conn:
+                return read_counter(conn, "loans_total")
+        except Exception as e:
+            print(f"Error estimating loans: {e}")
+            return 0
+
     @staticmethod
     def borrow_book(member_id, book_id):
-        conn = create_connection()
-        if not conn:
-            return False, "Database connection failed"
-            
+        return LoanService.borrow_books(member_id, [book_id])[book_id]
+
+    @staticmethod
+    def borrow_books(member_id, book_ids):
+        """
+        Check out a cart of books for one member in a single transaction.
+
+        loans/max_books applies to the whole cart: if the member's current
+        loans plus a cart of several books exceed it, nothing is borrowed. Otherwise each
+        book goes through a guarded stock UPDATE that carries every rule
+        (active member, loan limit, no duplicate loan, stock > 0), so two
+        desks can never take the same last copy; refused books are reported
+        and the rest are committed together.
+        Returns {book_id: (success, message)}.
+        """
+        from library_system.managers.settings_manager import SettingsManager
+        settings = SettingsManager()
+        max_books = settings.get("loans/max_books", int)
+        # The due date is fixed now, later changes to the loan period don't move it
+        duration = settings.get("loans/duration_days", int)
+        today = date.today()
+        due_date = today + timedelta(days=duration)
+
+        book_ids = list(book_ids)
+        if not book_ids:
+            return {}
+
         try:
-            cursor = conn.cursor()
-            
-            # 1. Validate Member (Must be active)
-            cursor.execute("SELECT is_active, name FROM members WHERE id = ?", (member_id,))
-            member = cursor.fetchone()
-            if not member:
-                return False, "Member not found"
-            if member['is_active'] != 1:
-                return False, f"Member '{member['name']}' is not active"
-
-            # 2. Validate Book (Stock > 0)
-            cursor.execute("SELECT stock, title FROM books WHERE id = ?", (book_id,))
-            book = cursor.fetchone()
-            if not book:
-                return False, "Book not found"
-            if book['stock'] <= 0:
-                return False, f"Book '{book['title']}' is out of stock"
-
-            # 3. Check for existing active loan of SAME book
-            cursor.execute("""
-                SELECT id FROM loans 
-                WHERE member_id = ? AND book_id = ? AND status = 'borrowed'
-            """, (member_id, book_id))
-            if cursor.fetchone():
-                return False, "Member is already borrowing this book"
-
-            # 3b. Check MAX BOOKS limit
-            from library_system.managers.settings_manager import SettingsManager
-            settings = SettingsManager()
-            max_books = int(settings.get("loans/max_books", 3))
-            
-            cursor.execute("""
-                SELECT COUNT(*) FROM loans 
-                WHERE member_id = ? AND status = 'borrowed'
-            """, (member_id,))
-            current_loans = cursor.fetchone()[0]
-            
-            if current_loans >= max_books:
-                return False, f"Member has reached the limit of {max_books} books"
-
-            # 4. Transaction: Insert Loan + Update Stock
-            today = date.today().isoformat()
-            
-            cursor.execute("""
-                INSERT INTO loans (book_id, member_id, loan_date, status)
-                VALUES (?, ?, ?, 'borrowed')
-            """, (book_id, member_id, today))
-            
-            cursor.execute("""
-                UPDATE books SET stock = stock - 1 WHERE id = ?
-            """, (book_id,))
-            
-            conn.commit()
-            return True, "Book borrowed successfully"
+            with db_connection() as conn:
+                # Take the write lock before checking, so nothing changes until commit
+                conn.execute("BEGIN IMMEDIATE")
+
+                member = conn.execute(
+                    "SELECT name, is_active, active_loans FROM members WHERE id = ?", (member_id,)
+                ).fetchone()
+                if member is None:
+                    return {book_id: (False, "Member not found") for book_id in book_ids}
+                if member['is_active'] != 1:
+                    message = f"Member '{member['name']}' is not active"
+                    return {book_id: (False, message) for book_id in book_ids}
+                # A single book goes through the per-book checks below instead,
+                # so borrow_book reports stock/duplicate problems before the limit
+                cart_size = len(set(book_ids))
+                if cart_size > 1 and member['active_loans'] + cart_size > max_books:
+                    message = (f"Member has reached the limit of {max_books} books "
+                               f"({member['active_loans']} on loan, {cart_size} in cart)")
+                    return {book_id: (False, message) for book_id in book_ids}
+
+                outcomes = {}
+                loan_ids = []
+                for book_id in book_ids:
+                    if book_id in outcomes:
+                        continue
+                    cursor = conn.execute("""
+                        UPDATE books SET stock = stock - 1
+                        WHERE id = :book AND stock > 0
+                          AND EXISTS (
+                              SELECT 1 FROM members
+                              WHERE id = :member AND is_active = 1 AND active_loans < :max_books
+                          )
+                          AND NOT EXISTS (
+                              SELECT 1 FROM loans
+                              WHERE member_id = :member AND book_id = :book AND status = 'borrowed'
+                          )
+                    """, {"book": book_id, "member": member_id, "max_books": max_books})
+                    if cursor.rowcount != 1:
+                        outcomes[book_id] = (False, LoanService._borrow_rejection(conn, member_id, book_id, max_books))
+                        continue
+
+                    # members.active_loans and the KPI counters follow via triggers
+                    cursor = conn.execute("""
+                        INSERT INTO loans (book_id, member_id, loan_date, due_date, status)
+                        VALUES (?, ?, ?, ?, 'borrowed')
+                    """, (book_id, member_id, today.isoformat(), due_date.isoformat()))
+                    loan_ids.append(cursor.lastrowid)
+                    outcomes[book_id] = (True, "Book borrowed successfully")
+
+                conn.commit()
+                if loan_ids:
+                    borrowed = tuple(book_id for book_id, (ok, _) in outcomes.items() if ok)
+                    EventBus().publish(LoanCreated(tuple(loan_ids), member_id, borrowed))
+                return outcomes
 
         except Exception as e:
-            conn.rollback()
-            print(f"Error borrowing book: {e}")
-            return False, str(e)
-        finally:
-            conn.close()
+            print(f"Error borrowing books: {e}")
+            return {book_id: (False, str(e)) for book_id in book_ids}
+
+    @staticmethod
+    def _borrow_rejection(conn, member_id, book_id, max_books):
+        """Reason a guarded checkout was refused (single lookup, same order as the old checks)."""
+        row = conn.execute("""
+            SELECT m.id AS member_id, m.name, m.is_active, m.active_loans,
+                   b.id AS book_id, b.title, b.stock,
+                   EXISTS (
+                       SELECT 1 FROM loans
+                       WHERE member_id = :member AND book_id = :book AND status = 'borrowed'
+                   ) AS already_borrowed
+            FROM (SELECT 1)
+            LEFT JOIN members m ON m.id = :member
+            LEFT JOIN books b ON b.id = :book
+        """, {"member": member_id, "book": book_id}).fetchone()
+
+        if row['member_id'] is None:
+            return "Member not found"
+        if row['is_active'] != 1:
+            return f"Member '{row['name']}' is not active"
+        if row['book_id'] is None:
+            return "Book not found"
+        if row['stock'] <= 0:
+            return f"Book '{row['title']}' is out of stock"
+        if row['already_borrowed']:
+            return "Member is already borrowing this book"
+        if row['active_loans'] >= max_books:
+            return f"Member has reached the limit of {max_books} books"
+        return "Book could not be borrowed"
 
     @staticmethod
     def return_book(loan_id):
-        conn = create_connection()
-        if not conn:
-            return False, "Database connection failed"
-            
+        return LoanService.return_books([loan_id])[loan_id]
+
+    @staticmethod
+    def return_books(loan_ids):
+        """
+        Return a batch of loans in one transaction (a single commit for the
+        whole batch). Loans and stock are updated set-based per chunk.
+        Returns {loan_id: (success, message)} for every requested id.
+        """
+        loan_ids = list(dict.fromkeys(loan_ids))
+        outcomes = {}
+        if not loan_ids:
+            return outcomes
+
+        today = date.today().isoformat()
+        returned_loans, returned_books = [], set()
         try:
-            cursor = conn.cursor()
-            
-            # 1. Get Loan Details
-            cursor.execute("SELECT book_id, loan_date, status FROM loans WHERE id = ?", (loan_id,))
-            loan = cursor.fetchone()
-            
-            if not loan:
-                return False, "Loan not found"
-            
-            if loan['status'] != 'borrowed':
-                return False, "Book is not currently borrowed"
-
-            book_id = loan['book_id']
-            loan_date_str = loan['loan_date']
-            
-            # 2. Determine Status (Overdue or Returned)
-            today = date.today()
-            loan_date = date.fromisoformat(loan_date_str)
-            
-            # Use Settings for Duration
-            from library_system.managers.settings_manager import SettingsManager
-            settings = SettingsManager()
-            duration = int(settings.get("loans/duration_days", 7))
-            
-            delta = (today - loan_date).days
-            new_status = 'overdue' if delta > duration else 'returned'
-            
-            # 3. Transaction
-            today_str = today.isoformat()
-            
-            cursor.execute("""
-                UPDATE loans 
-                SET return_date = ?, status = ? 
-                WHERE id = ?
-            """, (today_str, new_status, loan_id))
-            
-            cursor.execute("""
-                UPDATE books SET stock = stock + 1 WHERE id = ?
-            """, (book_id,))
-            
-            conn.commit()
-            return True, f"Book returned ({new_status})"
+            with db_connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for chunk, placeholders in chunked(loan_ids):
+                    # 1. Which loans can be returned, and are they late?
+                    rows = conn.execute(
+                        f"SELECT id, book_id, due_date, status FROM loans WHERE id IN ({placeholders})", chunk
+                    ).fetchall()
+                    found = {row['id']: row for row in rows}
+                    for loan_id in chunk:
+                        loan = found.get(loan_id)
+                        if loan is None:
+                            outcomes[loan_id] = (False, "Loan not found")
+                        elif loan['status'] != 'borrowed':
+                            outcomes[loan_id] = (False, "Book is not currently borrowed")
+                        else:
+                            new_status = 'overdue' if (loan['due_date'] or today) < today else 'returned'
+                            returned_loans.append(loan_id)
+                            returned_books.add(loan['book_id'])
+                            outcomes[loan_id] = (True, f"Book returned ({new_status})")
+
+                    # 2. Stock back, one UPDATE per chunk (a book may appear several times).
+                    # Must run before the loans leave status 'borrowed'.
+                    conn.execute(f"""
+                        UPDATE books SET stock = stock + (
+                            SELECT COUNT(*) FROM loans
+                            WHERE loans.book_id = books.id AND loans.status = 'borrowed'
+                              AND loans.id IN ({placeholders})
+                        )
+                        WHERE id IN (
+                            SELECT book_id FROM loans
+                            WHERE status = 'borrowed' AND id IN ({placeholders})
+                        )
+                    """, chunk + chunk)
+
+                    # 3. Close the loans; ISO dates compare as text
+                    conn.execute(f"""
+                        UPDATE loans
+                        SET return_date = ?,
+                            status = CASE WHEN due_date < ? THEN 'overdue' ELSE 'returned' END
+                        WHERE status = 'borrowed' AND id IN ({placeholders})
+                    """, [today, today] + chunk)
+
+                conn.commit()
+                if returned_loans:
+                    EventBus().publish(LoanReturned(tuple(returned_loans), tuple(sorted(returned_books))))
 
         except Exception as e:
-            conn.rollback()
-            print(f"Error returning book: {e}")
-            return False, str(e)
-        finally:
-            conn.close()
+            print(f"Error returning books: {e}")
+            return {loan_id: (False, str(e)) for loan_id in loan_ids}
+        return outcomes
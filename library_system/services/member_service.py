@@ -1,13 +1,17 @@
 import sqlite3
-from library_system.database.db import create_connection
+from library_system.database.counters import read_counter, read_counters
+from library_system.database.db import (
+    db_connection, fts_match_expression, split_page,
+    fts_prefix_match, query_cancelled, chunked
+)
+from library_system.services.events import EventBus, MemberChanged, MemberStatusChanged
 
 class MemberService:
     @staticmethod
     def get_all_members(active_only=True):
-        conn = create_connection()
         members = []
-        if conn:
-            try:
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
                 query = "SELECT * FROM members"
                 if active_only:
@@ -16,41 +20,178 @@ class MemberService:
                 
                 cursor.execute(query)
                 members = [dict(row) for row in cursor.fetchall()]
-            except Exception as e:
-                print(f"Error fetching members: {e}")
-            finally:
-                conn.close()
+        except Exception as e:
+            print(f"Error fetching members: {e}")
         return members
 
     @staticmethod
-    def search_members(keyword, active_only=True):
-        conn = create_connection()
+    def get_members_page(cursor=None, page_size=100, active_only=True):
+        """
+        One page of the member list, newest first (keyset pagination).
+        cursor: (created_at, id) of the previous page's last row, None for the first page.
+        Returns (members, next_cursor); next_cursor is None on the last page.
+        """
+        members, next_cursor = [], None
+        try:
+            with db_connection() as conn:
+                conditions = []
+                params = []
+                if active_only:
+                    conditions.append("is_active = 1")
+                if cursor:
+                    conditions.append("(created_at, id) < (?, ?)")
+                    params.extend(cursor)
+                where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+                query = f"""
+                    SELECT * FROM members
+                    {where}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT ?
+                """
+                params.append(page_size + 1)
+                rows = [dict(row) for row in conn.execute(query, params).fetchall()]
+                members, next_cursor = split_page(rows, page_size, ("created_at", "id"))
+        except Exception as e:
+            print(f"Error fetching members page: {e}")
+        return members, next_cursor
+
+    @staticmethod
+    def get_members_by_ids(member_ids):
+        """Rows for the given members, ordered like get_members_page (for patching views)."""
+        members = []
+        try:
+            with db_connection() as conn:
+                for chunk, placeholders in chunked(member_ids):
+                    members.extend(dict(row) for row in conn.execute(
+                        f"SELECT * FROM members WHERE id IN ({placeholders})", chunk
+                    ))
+        except Exception as e:
+            print(f"Error fetching members: {e}")
+        members.sort(key=lambda member: (member['created_at'], member['id']), reverse=True)
+        return members
+
+    @staticmethod
+    def estimate_total():
+        """Number of members from the KPI counters (cheap, for scrollbars and status text)."""
+        try:
+            with db_connection() as conn:
+                return read_counter(conn, "members_total")
+        except Exception as e:
+            print(f"Error estimating members: {e}")
+            return 0
+
+    @staticmethod
+    def count_members():
+        """Active and total member counts."""
+        counts = {"active": 0, "total": 0}
+        try:
+            with db_connection() as conn:
+                values = read_counters(conn, "members_active", "members_total")
+                counts["active"] = values["members_active"]
+                counts["total"] = values["members_total"]
+        except Exception as e:
+            print(f"Error counting members: {e}")
+        return counts
+
+    @staticmethod
+    def search_members(keyword, active_only=True, limit=None):
+        """
+        Relevance-ordered member lookup:
+        1. exact member_code, 2. member_code prefix (both a B-tree range scan),
+        3. name / email full-text matches ranked by bm25.
+        """
+        keyword = (keyword or "").strip()
+        if not keyword:
+            if limit:
+                # Newest members first, as get_all_members lists them
+                return MemberService.get_members_page(None, limit, active_only)[0]
+            return MemberService.get_all_members(active_only)
+
         members = []
-        if conn:
-            try:
+        seen = set()
+        max_rows = limit if limit else -1
+        # Unary + keeps the planner on the lookup index instead of idx_members_active_created
+        active_sql = " AND +is_active = 1" if active_only else ""
+
+        def add_rows(rows):
+            for row in rows:
+                if row['id'] not in seen and (limit is None or len(members) < limit):
+                    seen.add(row['id'])
+                    members.append(dict(row))
+
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
+
+                # 1: exact code
+                cursor.execute(f"""
+                    SELECT * FROM members
+                    WHERE member_code = ? COLLATE NOCASE {active_sql}
+                """, (keyword,))
+                add_rows(cursor.fetchall())
+
+                # 2: code prefix. Range [kw, kw + U+10FFFF) == "starts with",
+                # walked in index order so no sort is needed
+                cursor.execute(f"""
+                    SELECT * FROM members
+                    WHERE member_code >= ? COLLATE NOCASE
+                      AND member_code < ? COLLATE NOCASE
+                      {active_sql}
+                    ORDER BY member_code COLLATE NOCASE
+                    LIMIT ?
+                """, (keyword, keyword + "\U0010ffff", max_rows))
+                add_rows(cursor.fetchall())
+                if limit is not None and len(members) >= limit:
+                    return members
+
+                # 3: name / email
+                match = fts_match_expression(keyword)
+                if match:
+                    try:
+                        cursor.execute(f"""
+                            SELECT m.* FROM members_fts f
+                            JOIN members m ON m.id = f.rowid
+                            WHERE members_fts MATCH ? {active_sql.replace("+is_active", "+m.is_active")}
+                            ORDER BY bm25(members_fts, 5.0, 1.0)
+                            LIMIT ?
+                        """, (match, max_rows))
+                        add_rows(cursor.fetchall())
+                        return members
+                    except sqlite3.OperationalError as e:
+                        if query_cancelled():
+                            raise
+                        print(f"FTS search unavailable, using LIKE: {e}")
+
                 search_term = f"%{keyword}%"
                 query = """
                     SELECT * FROM members 
-                    WHERE (name LIKE ? OR member_code LIKE ? OR email LIKE ?)
+                    WHERE (name LIKE ? OR email LIKE ?)
                 """
                 if active_only:
                     query += " AND is_active = 1"
                 query += " ORDER BY created_at DESC"
 
-                cursor.execute(query, (search_term, search_term, search_term))
-                members = [dict(row) for row in cursor.fetchall()]
-            except Exception as e:
-                print(f"Error searching members: {e}")
-            finally:
-                conn.close()
+                cursor.execute(query, (search_term, search_term))
+                add_rows(cursor.fetchall())
+        except Exception as e:
+            if query_cancelled():
+                raise
+            print(f"Error searching members: {e}")
         return members
 
+    @staticmethod
+    def matches_search(member, keyword):
+        """True if `member` would be returned by search_members(keyword) (code prefix or FTS)."""
+        keyword = (keyword or "").strip()
+        code = str(member.get('member_code') or "")
+        if code.casefold().startswith(keyword.casefold()):
+            return True
+        return fts_prefix_match(keyword, member.get('name'), member.get('email'))
+
     @staticmethod
     def add_member(member_code, name, email, phone, address):
-        conn = create_connection()
-        if conn:
-            try:
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
                 query = """
                     INSERT INTO members (member_code, name, email, phone, address, is_active)
@@ -58,19 +199,16 @@ class MemberService:
                 """
                 cursor.execute(query, (member_code, name, email, phone, address))
                 conn.commit()
+                EventBus().publish(MemberChanged((cursor.lastrowid,), "created"))
                 return True
-            except sqlite3.IntegrityError:
-                print("Error: Member code must be unique.")
-                return False
-            finally:
-                conn.close()
-        return False
+        except sqlite3.IntegrityError:
+            print("Error: Member code must be unique.")
+            return False
 
     @staticmethod
     def update_member(member_id, member_code, name, email, phone, address):
-        conn = create_connection()
-        if conn:
-            try:
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
                 query = """
                     UPDATE members 
@@ -79,65 +217,91 @@ class MemberService:
                 """
                 cursor.execute(query, (member_code, name, email, phone, address, member_id))
                 conn.commit()
+                if cursor.rowcount:
+                    EventBus().publish(MemberChanged((member_id,)))
                 return True
-            except Exception as e:
-                print(f"Error updating member: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+        except Exception as e:
+            print(f"Error updating member: {e}")
+            return False
 
     @staticmethod
     def delete_member(member_id):
         """Soft delete member by setting is_active to 0."""
-        conn = create_connection()
-        if conn:
-            try:
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
                 query = "UPDATE members SET is_active=0 WHERE id=?"
                 cursor.execute(query, (member_id,))
                 conn.commit()
+                if cursor.rowcount:
+                    EventBus().publish(MemberStatusChanged((member_id,), False))
                 return True
-            except Exception as e:
-                print(f"Error deleting member: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+        except Exception as e:
+            print(f"Error deleting member: {e}")
+            return False
 
     @staticmethod
     def activate_member(member_id):
         """Re-activate member by setting is_active to 1."""
-        conn = create_connection()
-        if conn:
-            try:
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
                 query = "UPDATE members SET is_active=1 WHERE id=?"
                 cursor.execute(query, (member_id,))
                 conn.commit()
+                if cursor.rowcount:
+                    EventBus().publish(MemberStatusChanged((member_id,), True))
                 return True
-            except Exception as e:
-                print(f"Error activating member: {e}")
-                return False
-            finally:
-                conn.close()
-        return False
+        except Exception as e:
+            print(f"Error activating member: {e}")
+            return False
+
+    @staticmethod
+    def set_members_active(member_ids, active):
+        """
+        Activate or soft-delete many members in one transaction
+        (one UPDATE per chunk of ids). Members already in the requested
+        state count as success. Returns {member_id: (success, message)}.
+        """
+        value = 1 if active else 0
+        outcomes = {}
+        changed = 0
+        try:
+            with db_connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for chunk, placeholders in chunked(member_ids):
+                    found = {row[0] for row in conn.execute(
+                        f"SELECT id FROM members WHERE id IN ({placeholders})", chunk
+                    )}
+                    # Skip rows already in that state so triggers only fire for real changes
+                    changed += conn.execute(
+                        f"UPDATE members SET is_active = ? WHERE is_active IS NOT ? AND id IN ({placeholders})",
+                        [value, value] + chunk
+                    ).rowcount
+                    for member_id in chunk:
+                        outcomes[member_id] = (True, "Updated") if member_id in found else (False, "Member not found")
+                conn.commit()
+                # Nothing changed (all missing or already in that state): nothing to announce
+                if changed:
+                    updated = tuple(member_id for member_id, (ok, _) in outcomes.items() if ok)
+                    EventBus().publish(MemberStatusChanged(updated, bool(active)))
+        except Exception as e:
+            print(f"Error updating members: {e}")
+            return {member_id: (False, str(e)) for member_id in member_ids}
+        return outcomes
 
     @staticmethod
     def generate_member_code():
         """Auto-generate a simple unique code."""
         # This is a simplistic approach. Better to check max ID + 1
-        conn = create_connection()
         code = "MEM001"
-        if conn:
-            try:
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT MAX(id) FROM members")
                 max_id = cursor.fetchone()[0]
                 next_id = (max_id or 0) + 1
                 code = f"MEM{next_id:03d}"
-            except Exception:
-                pass
-            finally:
-                conn.close()
+        except Exception:
+            pass
         return code
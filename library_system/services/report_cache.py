@@ -0,0 +1,177 @@
+"""
+Result cache for ReportService.
+
+Reports are full-table GROUP BYs and anti-joins whose result only changes
+when the tables they read change. Each cached result is keyed by report,
+arguments and the "version:<table>" counters (migration 8) of the tables
+the report depends on, so any committed write - from this process or
+another one - makes the old entries unreachable. Reports that depend on
+today's date also carry the date in their key.
+
+Entries are evicted least recently used first, by count and by total rows.
+With reports/cache_persist enabled (off by default) the cache is saved as
+JSON in the report_cache table (migration 9) on exit and loaded on first
+use, so unchanged reports open instantly after a restart too.
+"""
+import atexit
+import json
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+from library_system.database.counters import read_counters
+from library_system.database.db import db_connection
+
+class ReportCache:
+    _instance = None
+
+    MAX_ENTRIES = 64
+    # Total rows over all entries (e.g. a year of loans by period is large)
+    MAX_ROWS = 200000
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ReportCache, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._entries = OrderedDict()  # key -> (rows, result), in LRU order
+            cls._instance._rows = 0
+            cls._instance._loaded = False
+            cls._instance.hits = 0
+            cls._instance.misses = 0
+            atexit.register(cls._instance.save)
+        return cls._instance
+
+    # ---- Lookup ----
+
+    def get_or_compute(self, name, args, kwargs, tables, daily, compute):
+        """Cached result of `compute()` for this report call, computing it on a miss."""
+        versions = self._versions(tables)
+        if versions is None:
+            # No version counters (old schema): can't tell when a result goes stale
+            return compute()
+
+        # A JSON string, so entries can be saved and loaded as they are
+        key = json.dumps([name, args, sorted(kwargs.items()), versions,
+                          date.today().isoformat() if daily else None], default=str)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # A failed or cancelled report raises here, so it is never stored
+        result = compute()
+        self._store(key, result)
+        return result
+
+    def _versions(self, tables):
+        try:
+            with db_connection() as conn:
+                values = read_counters(conn, *(f"version:{table}" for table in tables))
+        except Exception as e:
+            print(f"Error reading table versions: {e}")
+            return None
+        return tuple(values[f"version:{table}"] for table in tables)
+
+    def _store(self, key, result):
+        rows = len(result) if isinstance(result, (list, tuple)) else 1
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._rows -= old[0]
+            self._entries[key] = (rows, result)
+            self._rows += rows
+            while self._entries and (len(self._entries) > self.MAX_ENTRIES or self._rows > self.MAX_ROWS):
+                _, (evicted_rows, _) = self._entries.popitem(last=False)
+                self._rows -= evicted_rows
+
+    # ---- Stats ----
+
+    def stats(self):
+        """Hit/miss counts since start, hit rate (0..1) and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "rows": self._rows,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+
+    # ---- Persistence ----
+
+    def _enabled(self):
+        from library_system.managers.settings_manager import SettingsManager
+        return SettingsManager().get("reports/cache_persist", bool)
+
+    def _load(self):
+        # Called with the lock held, once
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            if not self._enabled():
+                return
+            with db_connection() as conn:
+                rows = conn.execute(
+                    "SELECT key, rows, result FROM report_cache ORDER BY position"
+                ).fetchall()
+            for key, count, result in rows:
+                self._entries[key] = (count, json.loads(result))
+                self._rows += count
+        except Exception as e:
+            print(f"Error loading report cache: {e}")
+            self._entries.clear()
+            self._rows = 0
+
+    def save(self):
+        """Write the cache to the report_cache table (if reports/cache_persist is on)."""
+        try:
+            # Never used this session: leave the saved entries as they are
+            if not self._loaded or not self._enabled():
+                return
+            with self._lock:
+                entries = list(self._entries.items())
+            with db_connection() as conn:
+                with conn:
+                    conn.execute("DELETE FROM report_cache")
+                    conn.executemany(
+                        "INSERT INTO report_cache (key, rows, result, position) VALUES (?, ?, ?, ?)",
+                        ((key, count, json.dumps(result, default=str), position)
+                         for position, (key, (count, result)) in enumerate(entries))
+                    )
+        except Exception as e:
+            print(f"Error saving report cache: {e}")
+
+
+def cached_report(*tables, daily=False):
+    """
+    Cache a ReportService method on the versions of `tables`.
+    daily=True for reports that also depend on today's date.
+    Cached results are shared between callers: treat them as read-only.
+
+    The method lets its errors propagate; the wrapper prints them and
+    returns an empty (uncached) result, so a transient failure such as
+    "database is locked" is not remembered as an empty report.
+    """
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                return ReportCache().get_or_compute(
+                    fn.__qualname__, args, kwargs, tables, daily, lambda: fn(*args, **kwargs)
+                )
+            except Exception as e:
+                print(f"Error {fn.__name__}: {e}")
+                return []
+        return wrapper
+    return decorate
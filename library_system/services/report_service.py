@@ -1,6 +1,8 @@
 import sqlite3
 from datetime import date
-from library_system.database.db import create_connection
+from library_system.database.counters import read_counters
+from library_system.database.db import db_connection, stream_query
+from library_system.services.report_cache import cached_report
 
 class ReportService:
     @staticmethod
@@ -12,202 +14,176 @@ class ReportService:
             "overdue_count": 0,
             "total_fines": 0
         }
-        conn = create_connection()
-        if conn:
-            try:
+        try:
+            with db_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Total Books
-                cursor.execute("SELECT COUNT(*) FROM books")
-                stats["total_books"] = cursor.fetchone()[0]
-                
-                # Active Members
-                cursor.execute("SELECT COUNT(*) FROM members WHERE is_active = 1")
-                stats["active_members"] = cursor.fetchone()[0]
-                
-                # Active Loans
-                cursor.execute("SELECT COUNT(*) FROM loans WHERE status = 'borrowed'")
-                stats["active_loans"] = cursor.fetchone()[0]
+                # Totals from the trigger-maintained counters
+                counters = read_counters(conn, "books_total", "members_active", "loans_borrowed")
+                stats["total_books"] = counters["books_total"]
+                stats["active_members"] = counters["members_active"]
+                stats["active_loans"] = counters["loans_borrowed"]
                 
                 # Overdue & Fines
-                # We need to calculate this manually since we don't have a fines table
-                # Get all borrowed loans that are overdue
+                # We don't have a fines table, so sum the overdue days of all
+                # borrowed loans past their due date (range scan on the index)
+                today = date.today().isoformat()
                 cursor.execute("""
-                    SELECT loan_date FROM loans 
+                    SELECT COUNT(*), SUM(julianday(?) - julianday(due_date))
+                    FROM loans 
                     WHERE status = 'borrowed' 
-                    AND date(loan_date, '+7 days') < date('now')
-                """)
-                overdue_loans = cursor.fetchall()
-                stats["overdue_count"] = len(overdue_loans)
+                    AND due_date < ?
+                """, (today, today))
+                overdue_count, overdue_days = cursor.fetchone()
+                stats["overdue_count"] = overdue_count
                 
                 if fine_per_day > 0:
-                    total_fines = 0
-                    today = date.today()
-                    for row in overdue_loans:
-                        loan_date = date.fromisoformat(row['loan_date'])
-                        delta = (today - loan_date).days
-                        overdue_days = delta - 7
-                        if overdue_days > 0:
-                            total_fines += (overdue_days * fine_per_day)
-                    stats["total_fines"] = total_fines
+                    stats["total_fines"] = int(overdue_days or 0) * fine_per_day
                 
-            except Exception as e:
-                print(f"Error stats: {e}")
-            finally:
-                conn.close()
+        except Exception as e:
+            print(f"Error stats: {e}")
         return stats
 
     @staticmethod
+    @cached_report("loans", "books", "members")
     def get_loans_by_period(start_date, end_date):
-        data = []
-        conn = create_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                query = """
-                    SELECT l.id, b.title, m.name, l.loan_date, l.return_date, l.status
-                    FROM loans l
-                    JOIN books b ON l.book_id = b.id
-                    JOIN members m ON l.member_id = m.id
-                    WHERE l.loan_date BETWEEN ? AND ?
-                    ORDER BY l.loan_date DESC
-                """
-                cursor.execute(query, (start_date, end_date))
-                data = [dict(row) for row in cursor.fetchall()]
-            except Exception as e:
-                print(f"Error loans period: {e}")
-            finally:
-                conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            query = """
+                SELECT l.id, b.title, m.name, l.loan_date, l.return_date, l.status
+                FROM loans l
+                JOIN books b ON l.book_id = b.id
+                JOIN members m ON l.member_id = m.id
+                WHERE l.loan_date BETWEEN ? AND ?
+                ORDER BY l.loan_date DESC
+            """
+            cursor.execute(query, (start_date, end_date))
+            data = [dict(row) for row in cursor.fetchall()]
         return data
 
     @staticmethod
+    def iter_loans_by_period(start_date, end_date):
+        """get_loans_by_period as chunks of tuples in table column order (for streaming exports)."""
+        return stream_query("""
+            SELECT l.id, b.title, m.name, l.loan_date, COALESCE(l.return_date, '-'), l.status
+            FROM loans l
+            JOIN books b ON l.book_id = b.id
+            JOIN members m ON l.member_id = m.id
+            WHERE l.loan_date BETWEEN ? AND ?
+            ORDER BY l.loan_date DESC
+        """, (start_date, end_date))
+
+    @staticmethod
+    @cached_report("loans", "books")
     def get_popular_books(limit=10):
-        data = []
-        conn = create_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                query = """
-                    SELECT b.title, b.author, COUNT(l.id) as borrow_count 
-                    FROM loans l
-                    JOIN books b ON l.book_id = b.id
-                    GROUP BY l.book_id
-                    ORDER BY borrow_count DESC
-                    LIMIT ?
-                """
-                cursor.execute(query, (limit,))
-                data = [dict(row) for row in cursor.fetchall()]
-            except Exception as e:
-                print(f"Error popular books: {e}")
-            finally:
-                conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            query = """
+                SELECT b.title, b.author, COUNT(l.id) as borrow_count 
+                FROM loans l
+                JOIN books b ON l.book_id = b.id
+                GROUP BY l.book_id
+                ORDER BY borrow_count DESC
+                LIMIT ?
+            """
+            cursor.execute(query, (limit,))
+            data = [dict(row) for row in cursor.fetchall()]
         return data
         
     @staticmethod
+    @cached_report("books", "loans", "categories")
     def get_never_borrowed_books():
-        data = []
-        conn = create_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                query = """
-                    SELECT b.title, b.author, c.name as category, b.stock
-                    FROM books b
-                    LEFT JOIN categories c ON b.category_id = c.id
-                    LEFT JOIN loans l ON b.id = l.book_id
-                    WHERE l.id IS NULL
-                    ORDER BY b.title ASC
-                """
-                cursor.execute(query)
-                data = [dict(row) for row in cursor.fetchall()]
-            except Exception as e:
-                print(f"Error never borrowed: {e}")
-            finally:
-                conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            query = """
+                SELECT b.title, b.author, c.name as category, b.stock
+                FROM books b
+                LEFT JOIN categories c ON b.category_id = c.id
+                LEFT JOIN loans l ON b.id = l.book_id
+                WHERE l.id IS NULL
+                ORDER BY b.title ASC
+            """
+            cursor.execute(query)
+            data = [dict(row) for row in cursor.fetchall()]
         return data
 
     @staticmethod
+    @cached_report("loans", "members")
     def get_active_members(limit=10):
-        data = []
-        conn = create_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                query = """
-                    SELECT m.name, m.member_code, COUNT(l.id) as borrow_count 
-                    FROM loans l
-                    JOIN members m ON l.member_id = m.id
-                    GROUP BY l.member_id
-                    ORDER BY borrow_count DESC
-                    LIMIT ?
-                """
-                cursor.execute(query, (limit,))
-                data = [dict(row) for row in cursor.fetchall()]
-            except Exception as e:
-                print(f"Error active members: {e}")
-            finally:
-                conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            query = """
+                SELECT m.name, m.member_code, COUNT(l.id) as borrow_count 
+                FROM loans l
+                JOIN members m ON l.member_id = m.id
+                GROUP BY l.member_id
+                ORDER BY borrow_count DESC
+                LIMIT ?
+            """
+            cursor.execute(query, (limit,))
+            data = [dict(row) for row in cursor.fetchall()]
         return data
 
     @staticmethod
+    @cached_report("loans", "books", "members", daily=True)
     def get_overdue_loans():
         data = []
-        conn = create_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                # Status 'borrowed' AND loan_date < 7 days ago
-                query = """
-                    SELECT 
-                        l.id, m.name as member_name, b.title as book_title, l.loan_date
-                    FROM loans l
-                    JOIN books b ON l.book_id = b.id
-                    JOIN members m ON l.member_id = m.id
-                    WHERE l.status = 'borrowed' 
-                    AND date(l.loan_date, '+7 days') < date('now')
-                """
-                cursor.execute(query)
-                rows = cursor.fetchall()
-                
-                # Calculate days overdue
-                today = date.today()
-                result = []
-                for row in rows:
-                    r = dict(row)
-                    loan_date = date.fromisoformat(r['loan_date'])
-                    delta = (today - loan_date).days
-                    days_overdue = delta - 7
-                    r['days_overdue'] = days_overdue
-                    result.append(r)
-                
-                # Sort by days overdue descending
-                result.sort(key=lambda x: x['days_overdue'], reverse=True)
-                data = result
-                
-            except Exception as e:
-                print(f"Error overdue: {e}")
-            finally:
-                conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            # Status 'borrowed' AND past due date.
+            # Oldest due date first == most days overdue first, straight from the index
+            today = date.today()
+            query = """
+                SELECT 
+                    l.id, m.name as member_name, b.title as book_title, l.loan_date, l.due_date
+                FROM loans l
+                JOIN books b ON l.book_id = b.id
+                JOIN members m ON l.member_id = m.id
+                WHERE l.status = 'borrowed' 
+                AND l.due_date < ?
+                ORDER BY l.due_date ASC
+            """
+            cursor.execute(query, (today.isoformat(),))
+            
+            # Calculate days overdue
+            for row in cursor.fetchall():
+                r = dict(row)
+                r['days_overdue'] = (today - date.fromisoformat(r['due_date'])).days
+                data.append(r)
+            
         return data
     
     @staticmethod
+    def iter_overdue_loans(fine_per_day=0):
+        """
+        get_overdue_loans as chunks of tuples in table column order, with
+        days overdue and the estimated fine (for streaming exports).
+        """
+        today = date.today().isoformat()
+        return stream_query("""
+            SELECT l.id, m.name, b.title, l.loan_date,
+                   CAST(julianday(?) - julianday(l.due_date) AS INTEGER) AS days_overdue,
+                   CAST(julianday(?) - julianday(l.due_date) AS INTEGER) * ? AS est_fine
+            FROM loans l
+            JOIN books b ON l.book_id = b.id
+            JOIN members m ON l.member_id = m.id
+            WHERE l.status = 'borrowed'
+            AND l.due_date < ?
+            ORDER BY l.due_date ASC
+        """, (today, today, fine_per_day, today))
+
+    @staticmethod
+    @cached_report("books")
     def get_low_stock_books(limit=20):
-        data = []
-        conn = create_connection()
-        if conn:
-            try:
-                cursor = conn.cursor()
-                query = """
-                    SELECT title, author, stock
-                    FROM books
-                    WHERE stock < 3
-                    ORDER BY stock ASC
-                    LIMIT ?
-                """
-                cursor.execute(query, (limit,))
-                data = [dict(row) for row in cursor.fetchall()]
-            except Exception as e:
-                print(f"Error low stock: {e}")
-            finally:
-                conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            query = """
+                SELECT title, author, stock
+                FROM books
+                WHERE stock < 3
+                ORDER BY stock ASC
+                LIMIT ?
+            """
+            cursor.execute(query, (limit,))
+            data = [dict(row) for row in cursor.fetchall()]
         return data
@@ -0,0 +1,128 @@
+import time
+from collections import OrderedDict
+from functools import partial
+from PySide6.QtCore import QObject, QTimer
+from library_system.services.async_runner import CANCELLED
+
+class DebouncedSearch(QObject):
+    """
+    Search-as-you-type for a page's QLineEdit.
+
+    - The query only runs once typing pauses for DELAY_MS.
+    - A query made stale by further typing is cancelled (the SQLite statement
+      is interrupted, see AsyncRunner.cancel).
+    - Results are cached per text. When the new text extends a cached one
+      whose result was complete (below `limit`), the cached rows are narrowed
+      in memory with `matches_fn` instead of querying again.
+
+    on_results(rows, elapsed_ms, from_cache) is called on the GUI thread,
+    on_cleared() when the text becomes empty.
+    """
+    DELAY_MS = 250
+    CACHE_SIZE = 32
+
+    def __init__(self, page, line_edit, search_fn, matches_fn, on_results, on_cleared, limit, **search_kwargs):
+        super().__init__(page)
+        self.page = page
+        self.line_edit = line_edit
+        self.search_fn = search_fn
+        self.matches_fn = matches_fn
+        self.on_results = on_results
+        self.on_cleared = on_cleared
+        self.limit = limit
+        self.search_kwargs = search_kwargs
+
+        self._cache = OrderedDict()  # casefolded text -> rows, in LRU order
+        self._running_key = None
+        self._started_at = 0.0
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.search_now)
+        line_edit.textChanged.connect(self._on_text_changed)
+
+    def text(self):
+        return self.line_edit.text().strip()
+
+    def is_active(self):
+        return bool(self.text())
+
+    def invalidate(self):
+        """Forget cached results, e.g. after the underlying data changed."""
+        self._cache.clear()
+
+    def search_now(self):
+        """Run the search for the current text immediately."""
+        self._timer.stop()
+        self._cancel_running()
+        text = self.text()
+        if not text:
+            return
+
+        self._started_at = time.perf_counter()
+        rows = self._from_cache(text)
+        if rows is not None:
+            self._deliver(text, rows, from_cache=True)
+            return
+
+        self._running_key = self.page.run_query(
+            self.search_fn, text, limit=self.limit, **self.search_kwargs,
+            on_result=partial(self._on_loaded, text),
+            on_error=self._on_failed
+        )
+
+    def _on_text_changed(self, _):
+        # Whatever is in flight no longer matches the text
+        self._cancel_running()
+        if not self.text():
+            self._timer.stop()
+            self.on_cleared()
+            return
+        self._timer.start(self.DELAY_MS)
+
+    def _cancel_running(self):
+        if self._running_key is not None:
+            self.page.cancel_query(self._running_key)
+            self._running_key = None
+
+    def _on_loaded(self, text, rows):
+        self._running_key = None
+        self._remember(text, rows)
+        if text == self.text():
+            self._deliver(text, rows, from_cache=False)
+
+    def _on_failed(self, message):
+        if message != CANCELLED:
+            self._running_key = None
+
+    def _deliver(self, text, rows, from_cache):
+        elapsed_ms = (time.perf_counter() - self._started_at) * 1000
+        self.on_results(rows, elapsed_ms, from_cache)
+
+    # ---- Cache ----
+
+    def _remember(self, text, rows):
+        self._cache[text.casefold()] = rows
+        self._cache.move_to_end(text.casefold())
+        while len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def _from_cache(self, text):
+        key = text.casefold()
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        # Longest cached prefix whose result was not cut off by the limit:
+        # typing more can only narrow a complete result set
+        best = None
+        for prefix, rows in self._cache.items():
+            if key.startswith(prefix) and len(rows) < self.limit:
+                if best is None or len(prefix) > len(best):
+                    best = prefix
+        if best is None:
+            return None
+
+        rows = [row for row in self._cache[best] if self.matches_fn(row, text)]
+        self._remember(text, rows)
+        return rows
@@ -1,17 +1,20 @@
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
-    QComboBox, QPushButton, QMessageBox, QFormLayout
+    QComboBox, QPushButton, QMessageBox, QFormLayout, QLineEdit, QListWidget, QListWidgetItem
 )
 from PySide6.QtCore import Qt
 from library_system.services.member_service import MemberService
 from library_system.services.book_service import BookService
+from library_system.managers.settings_manager import SettingsManager
 
 class LoanDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Tambah Peminjaman Baru")
-        self.setFixedWidth(400)
+        self.setFixedWidth(450)
         self.result_data = None
+        self.max_books = int(SettingsManager().get("loans/max_books", int) or 3)
+        self.cart = []  # book dicts, in scan order
         
         layout = QVBoxLayout(self)
         
@@ -23,13 +26,36 @@ class LoanDialog(QDialog):
         self.load_members()
         form_layout.addRow("Anggota:", self.member_combo)
         
-        # Book Selection
+        # Book Selection: pick from the list or scan / type the book ID
         self.book_combo = QComboBox()
         self.books = []
         self.load_books()
-        form_layout.addRow("Buku:", self.book_combo)
+        self.add_btn = QPushButton("Tambah")
+        self.add_btn.clicked.connect(self.add_selected_book)
+        book_row = QHBoxLayout()
+        book_row.addWidget(self.book_combo, stretch=1)
+        book_row.addWidget(self.add_btn)
+        form_layout.addRow("Buku:", book_row)
+
+        self.scan_input = QLineEdit()
+        self.scan_input.setPlaceholderText("Scan / ketik ID buku lalu Enter")
+        self.scan_input.returnPressed.connect(self.add_scanned_book)
+        form_layout.addRow("Scan:", self.scan_input)
         
         layout.addLayout(form_layout)
+
+        # Cart: every book is borrowed in one go when saving
+        self.cart_list = QListWidget()
+        layout.addWidget(self.cart_list)
+
+        cart_row = QHBoxLayout()
+        self.quota_label = QLabel()
+        self.remove_btn = QPushButton("Hapus dari Keranjang")
+        self.remove_btn.clicked.connect(self.remove_selected_book)
+        cart_row.addWidget(self.quota_label)
+        cart_row.addStretch()
+        cart_row.addWidget(self.remove_btn)
+        layout.addLayout(cart_row)
         
         # Buttons
         btn_layout = QHBoxLayout()
@@ -51,10 +77,12 @@ class LoanDialog(QDialog):
         self.validate_input()
         self.member_combo.currentIndexChanged.connect(self.validate_input)
         self.book_combo.currentIndexChanged.connect(self.validate_input)
+        self.scan_input.setFocus()
 
     def load_members(self):
         # Only active members
         self.members = MemberService.get_all_members(active_only=True)
+        self.member_loans = {m['id']: m.get('active_loans', 0) for m in self.members}
         self.member_combo.clear()
         for m in self.members:
             self.member_combo.addItem(f"{m['member_code']} - {m['name']}", userData=m['id'])
@@ -79,37 +107,92 @@ class LoanDialog(QDialog):
                 # We will handle validation in save()
             
             self.books.append(b)
+        self.books_by_id = {b['id']: b for b in self.books}
+
+    # ---- Cart ----
+
+    def add_selected_book(self):
+        book = self.selected_book()
+        if book is not None:
+            self.add_to_cart(book)
+
+    def add_scanned_book(self):
+        text = self.scan_input.text().strip()
+        self.scan_input.clear()
+        book = self.books_by_id.get(int(text)) if text.isdigit() else None
+        if book is None:
+            QMessageBox.warning(self, "Tidak Ditemukan", f"Buku dengan ID '{text}' tidak ditemukan")
+            return
+        self.add_to_cart(book)
+
+    def add_to_cart(self, book):
+        if book['stock'] <= 0:
+            QMessageBox.warning(self, "Stok Habis", f"Stok buku '{book['title']}' habis")
+            return
+        if any(b['id'] == book['id'] for b in self.cart):
+            return
+        self.cart.append(book)
+        item = QListWidgetItem(f"{book['title']} (Stok: {book['stock']})")
+        item.setData(Qt.UserRole, book['id'])
+        self.cart_list.addItem(item)
+        self.validate_input()
+
+    def remove_selected_book(self):
+        for item in self.cart_list.selectedItems():
+            book_id = item.data(Qt.UserRole)
+            self.cart = [b for b in self.cart if b['id'] != book_id]
+            self.cart_list.takeItem(self.cart_list.row(item))
+        self.validate_input()
+
+    def selected_book(self):
+        selected_idx = self.book_combo.currentIndex()
+        if 0 <= selected_idx < len(self.books):
+            return self.books[selected_idx]
+        return None
+
+    def checkout_books(self):
+        """
+        Books that Save borrows: the cart, or with an empty cart the book
+        selected in the list (the usual single-book checkout).
+        """
+        if self.cart:
+            return list(self.cart)
+        book = self.selected_book()
+        return [book] if book is not None else []
 
     def validate_input(self):
-        # Check if selection is valid
-        # For now, just ensure items are selected
-        is_valid = self.member_combo.currentIndex() >= 0 and self.book_combo.currentIndex() >= 0
-        
-        # Check stock
-        if self.book_combo.currentIndex() >= 0:
-             selected_idx = self.book_combo.currentIndex()
-             if selected_idx < len(self.books):
-                 if self.books[selected_idx]['stock'] <= 0:
-                     is_valid = False
-                     self.save_btn.setToolTip("Stok buku habis")
-                 else:
-                     self.save_btn.setToolTip("")
-        
+        # Member selected, something to borrow, in stock and within the loan limit
+        member_id = self.member_combo.currentData()
+        on_loan = self.member_loans.get(member_id, 0)
+        books = self.checkout_books()
+        in_cart = len(books)
+        self.quota_label.setText(f"Kuota: {on_loan + in_cart} / {self.max_books}")
+
+        is_valid = member_id is not None and in_cart > 0
+        if any(b['stock'] <= 0 for b in books):
+            is_valid = False
+            self.save_btn.setToolTip("Stok buku habis")
+        elif on_loan + in_cart > self.max_books:
+            is_valid = False
+            self.save_btn.setToolTip(f"Melebihi batas {self.max_books} buku")
+        else:
+            self.save_btn.setToolTip("")
+
+        self.save_btn.setText(f"Simpan ({in_cart})" if self.cart else "Simpan")
         self.save_btn.setEnabled(is_valid)
 
     def save(self):
         member_idx = self.member_combo.currentIndex()
-        book_idx = self.book_combo.currentIndex()
+        books = self.checkout_books()
         
-        if member_idx < 0 or book_idx < 0:
+        if member_idx < 0 or not books:
             return
             
         member_id = self.member_combo.currentData()
-        book_id = self.book_combo.currentData()
         
         self.result_data = {
             'member_id': member_id,
-            'book_id': book_id
+            'book_ids': [b['id'] for b in books]
         }
         self.accept()
 
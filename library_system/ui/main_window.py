@@ -2,6 +2,7 @@ from PySide6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
     QStackedWidget, QLabel, QFrame
 )
+from PySide6.QtCore import QTimer
 from library_system.pages.books_page import BooksPage
 from library_system.pages.members_page import MembersPage
 from library_system.pages.loans_page import LoansPage
@@ -11,6 +12,7 @@ from library_system.pages.settings_page import SettingsPage
 from library_system.managers.settings_manager import SettingsManager
 from library_system.ui.theme_manager import ThemeManager
 from library_system.ui.sidebar import Sidebar
+from library_system.utils.startup_timer import StartupTimer
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -51,11 +53,12 @@ class MainWindow(QMainWindow):
         
         main_layout.addLayout(content_layout)
         
-        # Init Pages
+        # Init Pages (placeholders, real pages are built on first visit)
         self.init_pages()
         
-        # Default Page
-        self.switch_page(0, "Dashboard")
+        # Default Page. Its data is loaded after the first paint (see paintEvent)
+        self._first_paint_done = False
+        self.switch_page(0, "Dashboard", refresh=False)
         self.sidebar.set_active_index(0)
 
     def create_top_bar(self):
@@ -79,32 +82,64 @@ class MainWindow(QMainWindow):
         top_bar_layout.addWidget(user_lbl)
 
     def init_pages(self):
-        # 0: Dashboard
-        self.dashboard_page = DashboardPage()
+        # Stack index -> (attribute name, factory). Pages are created lazily
+        # the first time they are shown; until then an empty placeholder
+        # holds their slot in the stack.
+        self.page_factories = [
+            ("dashboard_page", DashboardPage),  # 0: Dashboard
+            ("books_page", BooksPage),          # 1: Data Buku
+            ("members_page", MembersPage),      # 2: Anggota
+            ("loans_page", LoansPage),          # 3: Peminjaman
+            ("reports_page", ReportsPage),      # 4: Reports
+            ("settings_page", SettingsPage),    # 5: Settings
+        ]
+        for attr, _ in self.page_factories:
+            setattr(self, attr, None)
+            self.stack.addWidget(QWidget())
+
+    def get_page(self, index):
+        """Return the page at `index`, building it on first access."""
+        attr, factory = self.page_factories[index]
+        page = getattr(self, attr)
+        if page is not None:
+            return page
+
+        page = factory()
         # Connect navigate_to signal (inherited from BasePage)
-        self.dashboard_page.navigate_to.connect(self.navigate_from_dashboard)
-        self.stack.addWidget(self.dashboard_page)
+        if isinstance(page, DashboardPage):
+            page.navigate_to.connect(self.navigate_from_dashboard)
+        if isinstance(page, SettingsPage):
+            page.settings_updated.connect(self.refresh_ui_text)
+
+        placeholder = self.stack.widget(index)
+        self.stack.removeWidget(placeholder)
+        placeholder.deleteLater()
+        self.stack.insertWidget(index, page)
+        setattr(self, attr, page)
+        return page
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._first_paint_done:
+            self._first_paint_done = True
+            StartupTimer.mark("first_paint")
+            # Load the initial page once the window is actually on screen
+            QTimer.singleShot(0, self.load_initial_page)
+
+    def load_initial_page(self):
+        page = self.stack.currentWidget()
+        if hasattr(page, 'loading_changed'):
+            page.loading_changed.connect(self._on_initial_load_changed)
+        if hasattr(page, 'refresh_if_stale'):
+            page.refresh_if_stale()
+        if not getattr(page, 'is_loading', lambda: False)():
+            self._on_initial_load_changed(False)
 
-        # 1: Data Buku
-        self.books_page = BooksPage()
-        self.stack.addWidget(self.books_page)
-        
-        # 2: Anggota
-        self.members_page = MembersPage()
-        self.stack.addWidget(self.members_page)
-        
-        # 3: Peminjaman
-        self.loans_page = LoansPage()
-        self.stack.addWidget(self.loans_page)
-        
-        # 4: Reports
-        self.reports_page = ReportsPage()
-        self.stack.addWidget(self.reports_page)
-        
-        # 5: Settings
-        self.settings_page = SettingsPage()
-        self.settings_page.settings_updated.connect(self.refresh_ui_text)
-        self.stack.addWidget(self.settings_page)
+    def _on_initial_load_changed(self, loading):
+        if loading or StartupTimer.has_mark("initial_data_loaded"):
+            return
+        StartupTimer.mark("initial_data_loaded")
+        StartupTimer.report()
 
     def refresh_ui_text(self):
         # Update App Titles from Settings
@@ -125,11 +160,11 @@ class MainWindow(QMainWindow):
             # Sync Sidebar visual state
             self.sidebar.set_active_index(index)
 
-    def switch_page(self, index, title):
+    def switch_page(self, index, title, refresh=True):
+        current_page = self.get_page(index)
         self.stack.setCurrentIndex(index)
         self.header_label.setText(title)
         
-        # Polymorphic refresh
-        current_page = self.stack.widget(index)
-        if hasattr(current_page, 'refresh_data'):
-            current_page.refresh_data()
+        # Polymorphic refresh, skipped when the page's data has not changed
+        if refresh and hasattr(current_page, 'refresh_if_stale'):
+            current_page.refresh_if_stale()
@@ -0,0 +1,213 @@
+"""
+Columnar (Parquet / Feather) export of books, members and loans.
+
+Rows are streamed from SQLite in chunks and turned into typed Arrow
+columns, so the file keeps integer, boolean, date and timestamp types
+instead of CSV text, is much smaller, and loads straight into
+pandas.read_parquet / read_feather without parsing. Memory use is one
+chunk regardless of table size.
+
+Dates and timestamps are converted by SQLite (days / seconds since the
+epoch) so no Python-side date parsing is needed.
+
+pyarrow is only imported when an export runs. Headless use:
+
+    python -m library_system.utils.columnar_export loans loans.parquet
+"""
+import os
+from library_system.database.counters import read_counter
+from library_system.database.db import db_connection, query_cancelled, stream_query
+
+CHUNK_SIZE = 50000
+
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+FEATHER_EXTENSIONS = (".feather", ".arrow")
+
+# Arrow type name -> (storage type the SQL value is read as, final type)
+_TYPES = {
+    "int64": ("int64", "int64"),
+    "int32": ("int32", "int32"),
+    "string": ("string", "string"),
+    "bool": ("int8", "bool_"),
+    "date": ("int32", "date32"),
+    "timestamp": ("int64", "timestamp"),
+}
+
+def _days(column):
+    return f"CAST(julianday({column}) - 2440587.5 AS INTEGER)"
+
+def _seconds(column):
+    return f"CAST(strftime('%s', {column}) AS INTEGER)"
+
+# name -> (row counter, FROM clause, [(column, SQL expression, type)])
+DATASETS = {
+    "books": ("books_total", """
+        FROM books b
+        LEFT JOIN categories c ON b.category_id = c.id
+        ORDER BY b.id
+    """, [
+        ("id", "b.id", "int64"),
+        ("title", "b.title", "string"),
+        ("author", "b.author", "string"),
+        ("publisher", "b.publisher", "string"),
+        ("year", "b.year", "int32"),
+        ("stock", "b.stock", "int32"),
+        ("category", "c.name", "string"),
+        ("created_at", _seconds("b.created_at"), "timestamp"),
+    ]),
+    "members": ("members_total", """
+        FROM members m
+        ORDER BY m.id
+    """, [
+        ("id", "m.id", "int64"),
+        ("member_code", "m.member_code", "string"),
+        ("name", "m.name", "string"),
+        ("email", "m.email", "string"),
+        ("phone", "m.phone", "string"),
+        ("address", "m.address", "string"),
+        ("is_active", "m.is_active", "bool"),
+        ("active_loans", "m.active_loans", "int32"),
+        ("created_at", _seconds("m.created_at"), "timestamp"),
+    ]),
+    "loans": ("loans_total", """
+        FROM loans l
+        LEFT JOIN books b ON l.book_id = b.id
+        LEFT JOIN members m ON l.member_id = m.id
+        ORDER BY l.id
+    """, [
+        ("id", "l.id", "int64"),
+        ("book_id", "l.book_id", "int64"),
+        ("book_title", "b.title", "string"),
+        ("member_id", "l.member_id", "int64"),
+        ("member_code", "m.member_code", "string"),
+        ("member_name", "m.name", "string"),
+        ("loan_date", _days("l.loan_date"), "date"),
+        ("due_date", _days("l.due_date"), "date"),
+        ("return_date", _days("l.return_date"), "date"),
+        ("status", "l.status", "string"),
+    ]),
+}
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RuntimeError("Export Parquet/Feather membutuhkan paket pyarrow (pip install pyarrow)")
+    return pyarrow
+
+def _arrow_type(pa, name):
+    if name == "timestamp":
+        return pa.timestamp("s")
+    return getattr(pa, name)()
+
+def columnar_format(filepath):
+    """'parquet' or 'feather' from the file extension, None if neither."""
+    path = str(filepath).lower()
+    if path.endswith(PARQUET_EXTENSIONS):
+        return "parquet"
+    if path.endswith(FEATHER_EXTENSIONS):
+        return "feather"
+    return None
+
+def dataset_schema(dataset):
+    """Arrow schema of a dataset (column names and types)."""
+    pa = _pyarrow()
+    _, _, columns = DATASETS[dataset]
+    return pa.schema(
+        [pa.field(name, _arrow_type(pa, _TYPES[kind][1])) for name, _, kind in columns],
+        metadata={"dataset": dataset},
+    )
+
+def estimate_rows(dataset):
+    """Row count of a dataset from the KPI counters (for progress)."""
+    counter, _, _ = DATASETS[dataset]
+    try:
+        with db_connection() as conn:
+            return read_counter(conn, counter)
+    except Exception as e:
+        print(f"Error estimating {dataset}: {e}")
+        return 0
+
+def iter_dataset(dataset, chunk_size=CHUNK_SIZE):
+    """Rows of a dataset as chunks of tuples in schema column order."""
+    _, source, columns = DATASETS[dataset]
+    select = ", ".join(expr for _, expr, _ in columns)
+    return stream_query(f"SELECT {select} {source}", chunk_size=chunk_size)
+
+def _record_batch(pa, schema, kinds, chunk):
+    arrays = []
+    for field, kind, values in zip(schema, kinds, zip(*chunk)):
+        storage = _arrow_type(pa, _TYPES[kind][0])
+        array = pa.array(values, type=storage)
+        if storage != field.type:
+            array = array.cast(field.type)
+        arrays.append(array)
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def write_columnar(filepath, dataset, reporter=None, chunk_size=CHUNK_SIZE):
+    """
+    Write a dataset to `filepath` as Parquet or Feather (by extension),
+    zstd-compressed. Works without a GUI. A cancelled or failed export
+    removes the partial file. Returns the rows written.
+    """
+    fmt = columnar_format(filepath)
+    if fmt is None:
+        raise ValueError(f"Unknown columnar format for {filepath} (use .parquet or .feather)")
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset '{dataset}'")
+
+    pa = _pyarrow()
+    schema = dataset_schema(dataset)
+    kinds = [kind for _, _, kind in DATASETS[dataset][2]]
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(filepath, schema, compression="zstd")
+        write = lambda batch: writer.write_table(pa.Table.from_batches([batch]))
+    else:
+        # Feather v2 is the Arrow IPC file format
+        writer = pa.ipc.new_file(
+            filepath, schema, options=pa.ipc.IpcWriteOptions(compression="zstd")
+        )
+        write = writer.write_batch
+
+    written = 0
+    try:
+        with writer:
+            for chunk in iter_dataset(dataset, chunk_size):
+                write(_record_batch(pa, schema, kinds, chunk))
+                written += len(chunk)
+                if reporter is not None:
+                    reporter.rows_written.emit(written)
+                # Between chunks the statement isn't running, check here too
+                if query_cancelled():
+                    from library_system.services.async_runner import CANCELLED
+                    raise RuntimeError(CANCELLED)
+    except BaseException:
+        try:
+            os.remove(filepath)
+        except OSError:
+            pass
+        raise
+    return written
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    from library_system.database.db import initialize_db
+
+    parser = argparse.ArgumentParser(description="Export library data as Parquet or Feather")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("output", help="target file (.parquet or .feather)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if columnar_format(args.output) is None:
+        parser.error("output must end in .parquet or .feather")
+
+    initialize_db()
+    start = time.perf_counter()
+    rows = write_columnar(args.output, args.dataset, chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(args.output)
+    print(f"{rows} rows written to {args.output} ({size / 1024:.1f} KiB) in {elapsed:.2f}s")
@@ -1,6 +1,19 @@
 import csv
-from PySide6.QtWidgets import QFileDialog, QMessageBox, QTableView
-from PySide6.QtCore import QAbstractItemModel
+import gzip
+import os
+from PySide6.QtWidgets import QFileDialog, QMessageBox, QTableView, QProgressDialog
+from PySide6.QtCore import QAbstractItemModel, QObject, Qt, Signal
+from library_system.database.db import query_cancelled
+from library_system.services.async_runner import AsyncRunner, CANCELLED
+
+CSV_FILTER = "CSV Files (*.csv)"
+GZIP_FILTER = "Gzip CSV (*.csv.gz)"
+PARQUET_FILTER = "Parquet (*.parquet)"
+FEATHER_FILTER = "Feather (*.feather)"
+
+class _ExportProgress(QObject):
+    # Rows written so far; emitted from the worker, delivered on the GUI thread
+    rows_written = Signal(int)
 
 class ExportUtils:
     @staticmethod
@@ -38,3 +51,125 @@ class ExportUtils:
             
         except Exception as e:
             QMessageBox.critical(parent, "Error", f"Gagal export data: {e}")
+
+    @staticmethod
+    def export_query_to_csv(parent, headers, fetch_chunks, *args, filename="export.csv", total=None):
+        """
+        Export a service-level row stream to CSV without blocking the UI.
+
+        fetch_chunks(*args) runs on a worker thread and yields lists of row
+        tuples (e.g. LoanService.iter_loan_history), which are written to
+        disk chunk by chunk, so memory use doesn't grow with the result.
+        A progress dialog (out of `total` rows, if known) can cancel the
+        export. Choosing a .csv.gz name writes gzip-compressed output.
+        """
+        filepath, selected_filter = QFileDialog.getSaveFileName(
+            parent, "Export to CSV", filename, f"{CSV_FILTER};;{GZIP_FILTER}"
+        )
+        if not filepath:
+            return
+        if selected_filter == GZIP_FILTER and not filepath.endswith(".gz"):
+            filepath += ".gz"
+
+        ExportUtils._run_export(
+            parent, filepath, total, ExportUtils.write_csv, filepath, headers, fetch_chunks, args
+        )
+
+    @staticmethod
+    def export_dataset(parent, dataset, filename=None):
+        """
+        Export a whole table (books, members or loans) as Parquet or Feather
+        on a worker thread, with typed columns (see utils.columnar_export).
+        """
+        from library_system.utils.columnar_export import estimate_rows, write_columnar
+
+        filepath, selected_filter = QFileDialog.getSaveFileName(
+            parent, "Export Data", filename or f"{dataset}.parquet", f"{PARQUET_FILTER};;{FEATHER_FILTER}"
+        )
+        if not filepath:
+            return
+        extension = ".feather" if selected_filter == FEATHER_FILTER else ".parquet"
+        if not filepath.lower().endswith(extension):
+            filepath += extension
+
+        ExportUtils._run_export(
+            parent, filepath, estimate_rows(dataset), write_columnar, filepath, dataset
+        )
+
+    @staticmethod
+    def _run_export(parent, filepath, total, write_fn, *args):
+        """
+        Run write_fn(*args, reporter) on a worker thread behind a progress
+        dialog (out of `total` rows, if known) that can cancel it.
+        """
+        key = ("export", filepath)
+        if AsyncRunner().is_running(key):
+            QMessageBox.warning(parent, "Export", f"Export ke file ini masih berjalan:\n{filepath}")
+            return
+
+        progress = QProgressDialog("Mengekspor data...", "Batal", 0, total or 0, parent)
+        progress.setWindowTitle("Export")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(300)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+
+        reporter = _ExportProgress(progress)
+
+        def on_rows(count):
+            if total:
+                progress.setValue(min(count, total))
+            progress.setLabelText(f"Mengekspor data... {count:,} baris")
+
+        reporter.rows_written.connect(on_rows)
+
+        def done(count):
+            progress.close()
+            QMessageBox.information(parent, "Sukses", f"{count:,} baris berhasil diexport ke:\n{filepath}")
+
+        def failed(message):
+            progress.close()
+            if message == CANCELLED:
+                QMessageBox.information(parent, "Export", "Export dibatalkan")
+            else:
+                QMessageBox.critical(parent, "Error", f"Gagal export data: {message}")
+
+        AsyncRunner().run(
+            write_fn, *args, reporter,
+            key=key, on_result=done, on_error=failed
+        )
+        progress.canceled.connect(lambda: AsyncRunner().cancel(key))
+        progress.show()
+
+    @staticmethod
+    def write_csv(filepath, headers, fetch_chunks, args=(), reporter=None):
+        """
+        Write the chunks of fetch_chunks(*args) to `filepath` (gzip if it
+        ends in .gz). Works without a GUI, e.g. from scripts. A cancelled or
+        failed export removes the partial file. Returns the rows written.
+        """
+        if str(filepath).endswith(".gz"):
+            # Level 6: close to the default's size at a fraction of its time
+            file = gzip.open(filepath, "wt", newline="", encoding="utf-8", compresslevel=6)
+        else:
+            file = open(filepath, "w", newline="", encoding="utf-8")
+        written = 0
+        try:
+            with file:
+                writer = csv.writer(file)
+                writer.writerow(headers)
+                for chunk in fetch_chunks(*args):
+                    writer.writerows(chunk)
+                    written += len(chunk)
+                    if reporter is not None:
+                        reporter.rows_written.emit(written)
+                    # Between chunks the statement isn't running, check here too
+                    if query_cancelled():
+                        raise RuntimeError(CANCELLED)
+        except BaseException:
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+            raise
+        return written
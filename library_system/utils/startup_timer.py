@@ -0,0 +1,61 @@
+import os
+import time
+from datetime import datetime
+
+class StartupTimer:
+    """
+    Collects named checkpoints between process start and the first loaded page.
+    Import it as early as possible in main_app.py so the clock starts there.
+
+    Diagnostics only: report() does nothing unless the LIBRARY_STARTUP_TIMING
+    environment variable is set (e.g. LIBRARY_STARTUP_TIMING=1).
+    """
+    ENV_VAR = "LIBRARY_STARTUP_TIMING"
+    # Launches kept in startup_times.log (oldest lines are dropped)
+    MAX_LOG_LINES = 500
+
+    _start = time.perf_counter()
+    _marks = []
+    _reported = False
+
+    @classmethod
+    def mark(cls, name):
+        cls._marks.append((name, (time.perf_counter() - cls._start) * 1000))
+
+    @classmethod
+    def has_mark(cls, name):
+        return any(mark == name for mark, _ in cls._marks)
+
+    @classmethod
+    def report(cls):
+        """
+        Print the timeline once and append a summary line to startup_times.log,
+        if enabled through LIBRARY_STARTUP_TIMING.
+        """
+        if cls._reported or not os.environ.get(cls.ENV_VAR):
+            return
+        cls._reported = True
+
+        lines = ["[STARTUP] timeline:"]
+        prev = 0.0
+        for name, at in cls._marks:
+            lines.append(f"[STARTUP]   {name:<22} {at:8.1f} ms  (+{at - prev:.1f})")
+            prev = at
+        print("\n".join(lines))
+
+        # One line per launch so time-to-first-paint can be tracked as the DB grows
+        try:
+            from library_system.utils.paths import AppPaths
+            db_path = AppPaths.get_db_path()
+            db_size = db_path.stat().st_size if db_path.exists() else 0
+            marks = " ".join(f"{name}={at:.0f}" for name, at in cls._marks)
+            log_file = db_path.parent / "startup_times.log"
+            lines = []
+            if log_file.exists():
+                with open(log_file, "r", encoding="utf-8") as f:
+                    lines = f.readlines()
+            lines.append(f"{datetime.now().isoformat(timespec='seconds')} db_bytes={db_size} {marks}\n")
+            with open(log_file, "w", encoding="utf-8") as f:
+                f.writelines(lines[-cls.MAX_LOG_LINES:])
+        except Exception as e:
+            print(f"Error writing startup log: {e}")
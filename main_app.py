@@ -1,9 +1,12 @@
 import sys
 import os
+# Imported first so the startup clock starts as early as possible
+from library_system.utils.startup_timer import StartupTimer
 from PySide6.QtWidgets import QApplication
 from library_system.ui.main_window import MainWindow
 
 def main():
+    StartupTimer.mark("imports")
     app = QApplication(sys.argv)
     
     # Initialize Database
@@ -12,20 +15,32 @@ def main():
         initialize_db()
     except Exception as e:
         print(f"Failed to init DB: {e}")
+    StartupTimer.mark("db_initialized")
+
+    # Let background queries finish, then close pooled connections
+    from library_system.database.db import close_all_connections
+    from library_system.services.async_runner import AsyncRunner
+    app.aboutToQuit.connect(AsyncRunner().shutdown)
+    app.aboutToQuit.connect(close_all_connections)
 
     # Init Config & Theme
     from library_system.managers.settings_manager import SettingsManager
     from library_system.ui.theme_manager import ThemeManager
     
     # Ensure settings are initialized (instance created)
-    SettingsManager()
+    # and pending changes are written before exit
+    app.aboutToQuit.connect(SettingsManager().flush)
     
     # Load and Apply Theme
     saved_theme = ThemeManager.load_theme()
     ThemeManager.apply_theme(saved_theme)
 
+    StartupTimer.mark("theme_applied")
+
     window = MainWindow()
+    StartupTimer.mark("window_built")
     window.show()
+    StartupTimer.mark("window_shown")
     
     sys.exit(app.exec())
 